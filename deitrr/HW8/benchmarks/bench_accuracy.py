@@ -0,0 +1,67 @@
+"""Cost and achieved error of the Cosmology accuracy tiers
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_accuracy.py
+
+For each tier the scalar and 1e6-element array times of DL are printed
+with the largest relative error against the 'precise' tier and the
+error the tier itself estimates (Cosmology.error).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology, integral_cache
+from cosmology.cosmology import ACCURACY
+
+
+def timeit(func, repeat=3, number=1):
+    """Best mean wall time per call over a few repeats, in seconds"""
+    best = np.inf
+    for i in range(repeat):
+        t0 = time.time()
+        for j in range(number):
+            func()
+        best = min(best, (time.time() - t0) / number)
+    return best
+
+
+def main():
+    integral_cache.maxbytes = 0
+    rng = np.random.RandomState(0)
+    zscalar = rng.uniform(0, 3, 200).tolist()
+    z = rng.uniform(0, 3, 10 ** 6)
+
+    precise = Cosmology(accuracy='precise')
+    exact_scalar = np.array([precise.DL(zi) for zi in zscalar])
+    exact = precise.DL(z)
+
+    print("%-8s %-6s %8s %12s %12s %10s %10s"
+          % ("tier", "backend", "rtol", "scalar (us)", "1e6 (s)",
+             "max err", "estimate"))
+    for accuracy in ('fast', 'default', 'precise'):
+        cosmo = Cosmology(accuracy=accuracy)
+        cosmo.DL(0.5)   # build any table outside the timing
+
+        def scalar():
+            for zi in zscalar:
+                cosmo.DL(zi)
+        t_scalar = timeit(scalar) / len(zscalar)
+        t_array = timeit(lambda: cosmo.DL(z))
+
+        approx = np.array([cosmo.DL(zi) for zi in zscalar])
+        err = max(np.max(abs(approx[1:] - exact_scalar[1:])
+                         / exact_scalar[1:]),
+                  np.max(abs(cosmo.DL(z) - exact)[z > 0] / exact[z > 0]))
+        estimate = np.max(cosmo.error(zscalar))
+        print("%-8s %-6s %8.0e %12.2f %12.4g %10.2e %10.2e"
+              % (accuracy, cosmo.backend, ACCURACY[accuracy][1],
+                 1e6 * t_scalar, t_array, err, estimate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark the closed-form flat-LCDM backend against scipy quad
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_analytic.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology
+
+
+def timeit(func, *args, **kwargs):
+    """Best wall time of a few repeats, in seconds"""
+    repeat = kwargs.pop('repeat', 3)
+    best = np.inf
+    for i in range(repeat):
+        t0 = time.time()
+        func(*args)
+        best = min(best, time.time() - t0)
+    return best
+
+
+def main():
+    z = np.concatenate([[0, 1e-6, 1e-3], np.logspace(-2, np.log10(1100), 200)])
+
+    print("Accuracy of 'analytic' vs 'quad', z in [0, 1100]")
+    print("%8s %14s" % ("OmegaM", "max rel err"))
+    for OmegaM in (0.05, 0.3, 0.7, 1.0):
+        quad = Cosmology(OmegaM=OmegaM)
+        exact = np.array([quad.DC(zi) for zi in z])
+        approx = Cosmology(OmegaM=OmegaM, backend='analytic').DC(z)
+        err = np.max(abs(approx[1:] - exact[1:]) / exact[1:])
+        print("%8.2f %14.2e" % (OmegaM, err))
+
+    print("")
+    print("Speed, OmegaM = 0.3")
+    print("%10s %14s %14s %10s" % ("N", "quad (s)", "analytic (s)", "speedup"))
+    quad = Cosmology()
+    analytic = Cosmology(backend='analytic')
+    rng = np.random.RandomState(0)
+    for N in (1, 100, 10000, 1000000):
+        zN = rng.uniform(0, 1100, N)
+        if N == 1:
+            t_quad = timeit(quad.DC, zN[0])
+            t_analytic = timeit(analytic.DC, zN[0])
+        else:
+            # per-element quad is timed on a subset and scaled up
+            nq = min(N, 1000)
+            t_quad = timeit(lambda: [quad.DC(zi) for zi in zN[:nq]]) * N / nq
+            t_analytic = timeit(analytic.DC, zN)
+        print("%10d %14.4g %14.4g %10.1f"
+              % (N, t_quad, t_analytic, t_quad / t_analytic))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Start-up cost of the cosmology package
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_import.py [repeat]
+
+Each scenario runs in fresh interpreters under ``python -X importtime``.
+The best of `repeat` runs is reported as the total time spent importing
+modules, the part of it beyond a bare ``import numpy`` (that is, due to
+the cosmology package and what it pulls in besides NumPy), whether SciPy
+was imported and the costliest modules.  ``import cosmology`` should
+stay under TARGET milliseconds.
+"""
+import os
+import subprocess
+import sys
+
+PACKAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# milliseconds allowed for a bare "import cosmology"
+TARGET = 50.0
+
+SCENARIOS = [
+    ('import cosmology', "import cosmology"),
+    ('from cosmology import Cosmology',
+     "from cosmology import Cosmology"),
+    ('analytic DL', "from cosmology import Cosmology; "
+     "Cosmology(backend='analytic').DL(1.0)"),
+    ('table DL', "from cosmology import Cosmology; "
+     "Cosmology(backend='table').DL(1.0)"),
+    ('quad DL', "from cosmology import Cosmology; "
+     "Cosmology(backend='quad').DL(1.0)"),
+    ('compiled quad DL', "import cosmology; cosmology.build_library(); "
+     "cosmology.Cosmology(backend='quad').DL(1.0)"),
+]
+
+
+def importtime(code):
+    """{module: (self, cumulative, depth)} in microseconds, for one run"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=PACKAGE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(own), int(cumulative), depth)
+    return modules
+
+
+def total(modules):
+    """Time spent importing all modules, in milliseconds"""
+    return 1e-3 * sum(own for own, cumulative, depth in modules.values())
+
+
+def best(code, repeat):
+    """importtime of the fastest of repeat runs of code"""
+    return min([importtime(code) for i in range(repeat)], key=total)
+
+
+def main(repeat=5):
+    baseline = total(best("import numpy", repeat))
+    print("import numpy alone: %.1f ms" % baseline)
+    print("%-32s %10s %11s %6s  %s" % ("scenario", "total (ms)",
+                                       "over numpy", "scipy",
+                                       "costliest modules (ms, self)"))
+    for label, code in SCENARIOS:
+        modules = best(code, repeat)
+        costly = sorted(modules.items(), key=lambda item: -item[1][0])[:3]
+        extra = ('%.1f' % (total(modules) - baseline)
+                 if 'numpy' in modules else '-')
+        print("%-32s %10.1f %11s %6s  %s"
+              % (label, total(modules), extra,
+                 'scipy' in modules,
+                 ', '.join('%s %.1f' % (name, 1e-3 * times[0])
+                           for name, times in costly)))
+        if code == "import cosmology" and total(modules) > TARGET:
+            print("  ! over the %.0f ms target" % TARGET)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,82 @@
+"""Lensing critical surface density over lens-source pair lists
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_lensing.py [n_pairs]
+
+Builds a random CSR neighbor list between a lens and a source catalog
+and times Cosmology.sigma_crit over it, and over the same pairs given as
+two flat redshift arrays, with the peak memory allocated beyond the
+inputs and the output array (tracemalloc), against evaluating the pairs
+one by one with scalar distances, extrapolated from a small sample.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology, integral_cache, table_store
+from cosmology.cosmology import SIGMA_CRIT_SCALE
+
+# time the distance evaluations, not the caches
+table_store.maxbytes = 0
+integral_cache.maxbytes = 0
+
+
+def pair_list(n_lens, n_source, n_pairs, rng):
+    """Random CSR neighbor list with n_pairs entries"""
+    counts = rng.multinomial(n_pairs, np.ones(n_lens) / n_lens)
+    indptr = np.concatenate(([0], np.cumsum(counts)))
+    indices = rng.randint(0, n_source, n_pairs)
+    return indptr, indices
+
+
+def per_pair(cosmo, zl, zs):
+    """sigma_crit from scalar distances, one pair at a time"""
+    if zs <= zl:
+        return np.inf
+    DS = cosmo.DA(zs)
+    return SIGMA_CRIT_SCALE * DS / (cosmo.DA(zl) * cosmo.DA12(zl, zs))
+
+
+def main(n_pairs=10 ** 7):
+    rng = np.random.RandomState(0)
+    zl = np.round(rng.uniform(0.1, 0.8, 10 ** 4), 4)
+    zs = np.round(rng.uniform(0.2, 3.0, 10 ** 5), 4)
+    indptr, indices = pair_list(len(zl), len(zs), n_pairs, rng)
+    print("%d lenses, %d sources, %d pairs" % (len(zl), len(zs), n_pairs))
+    print("%-8s %-22s %12s %14s" % ("backend", "method", "seconds",
+                                    "peak extra MB"))
+    # the same pairs as flat arrays of lens and source redshifts
+    zl_pairs = zl[np.repeat(np.arange(len(zl)), np.diff(indptr))]
+    zs_pairs = zs[indices]
+    for backend in ('quad', 'table'):
+        cosmo = Cosmology(backend=backend)
+        out = np.empty(n_pairs)
+        for method, args in (('sigma_crit (CSR)', (zl, zs, indptr, indices)),
+                             ('sigma_crit (arrays)', (zl_pairs, zs_pairs))):
+            tracemalloc.start()
+            t0 = time.time()
+            cosmo.sigma_crit(*args, out=out)
+            seconds = time.time() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%-8s %-22s %12.3f %14.1f"
+                  % (backend, method, seconds, peak / 2.0 ** 20))
+
+        # a sample of the pairs, evaluated with scalar calls
+        rows = np.searchsorted(indptr, np.arange(1000), side='right') - 1
+        t0 = time.time()
+        for k, i in enumerate(rows):
+            y = per_pair(cosmo, float(zl[i]), float(zs[indices[k]]))
+            assert y == out[k] or abs(y / out[k] - 1) < 1e-6
+        seconds = (time.time() - t0) * n_pairs / len(rows)
+        print("%-8s %-22s %12.3f %14s"
+              % (backend, "per pair (estimated)", seconds, "-"))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,50 @@
+"""Benchmark the scaling of Cosmology.map with the number of processes
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_map.py [N] [backend]
+
+Prints throughput and parallel efficiency for 1, 2, 4, ... processes
+up to the number of CPUs on this machine.
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology
+
+
+def main(N=10 ** 7, backend='quad'):
+    cosmo = Cosmology(backend=backend)
+    z = np.random.RandomState(0).uniform(0, 3, N)
+
+    ncpu = multiprocessing.cpu_count()
+    n_jobs = [1]
+    while 2 * n_jobs[-1] <= ncpu:
+        n_jobs.append(2 * n_jobs[-1])
+    if n_jobs[-1] != ncpu:
+        n_jobs.append(ncpu)
+
+    print("mu for N = %d redshifts, backend = %r, %d CPUs"
+          % (N, backend, ncpu))
+    print("%8s %10s %14s %10s %11s"
+          % ("n_jobs", "time (s)", "rows / s", "speedup", "efficiency"))
+    serial = None
+    for n in n_jobs:
+        t0 = time.time()
+        cosmo.map('mu', z, n_jobs=n)
+        t = time.time() - t0
+        if serial is None:
+            serial = t
+        print("%8d %10.3f %14.4g %10.2f %11.2f"
+              % (n, t, N / t, serial / t, serial / t / n))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(int(float(args[0])) if args else 10 ** 7,
+         *args[1:2])
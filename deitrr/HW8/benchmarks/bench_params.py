@@ -0,0 +1,46 @@
+"""Cost of constructing, reading, hashing and pickling Cosmology
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_params.py
+"""
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology
+
+
+def per_call(stmt, number=100000, **namespace):
+    """Best time per execution of stmt over a few repeats, in seconds"""
+    timer = timeit.Timer(stmt, globals=namespace)
+    return min(timer.repeat(3, number)) / number
+
+
+def main():
+    cosmo = Cosmology(OmegaM=0.3, h=0.7)
+    data = pickle.dumps(cosmo, pickle.HIGHEST_PROTOCOL)
+    cases = [
+        ("construct", per_call("Cosmology(0.3, 0.7)", Cosmology=Cosmology)),
+        ("read OmegaM", per_call("cosmo.OmegaM", number=10 ** 6,
+                                 cosmo=cosmo)),
+        ("read DH", per_call("cosmo.DH", number=10 ** 6, cosmo=cosmo)),
+        ("dict lookup", per_call("d[cosmo]", d={cosmo: 1}, cosmo=cosmo)),
+        ("pickle", per_call("dumps(cosmo, -1)", dumps=pickle.dumps,
+                            cosmo=cosmo)),
+        ("unpickle", per_call("loads(data)", loads=pickle.loads,
+                              data=data)),
+    ]
+    for name, seconds in cases:
+        print("%-12s %10.1f ns" % (name, 1e9 * seconds))
+    print("%-12s %10d bytes" % ("pickle size", len(data)))
+    size = sys.getsizeof(cosmo)
+    if hasattr(cosmo, '__dict__'):
+        size += sys.getsizeof(cosmo.__dict__)
+    print("%-12s %10d bytes" % ("instance", size))
+
+
+if __name__ == '__main__':
+    main()
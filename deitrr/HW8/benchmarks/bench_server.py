@@ -0,0 +1,109 @@
+"""Load test of the micro-batching distance server
+
+Starts ``python -m cosmology.server`` in a subprocess and drives it from
+many concurrent asyncio clients on the same machine, each sending its
+requests one after another.  Reports the median and 99th percentile
+request latency and the throughput, with batching and with every request
+evaluated on its own (max_batch = 1):
+
+    python benchmarks/bench_server.py --clients 64 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = os.path.join(HERE, '..')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, max_batch, max_delay):
+    """Run the server in a subprocess and wait until it accepts clients"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'cosmology.server', '--port', str(port),
+         '--max-batch', str(max_batch), '--max-delay', str(max_delay)],
+        cwd=PACKAGE)
+    for i in range(200):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def client(port, nrequests, nz, latencies, seed):
+    """Send nrequests requests of nz redshifts, recording each latency"""
+    rng = np.random.RandomState(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for i in range(nrequests):
+        request = dict(z=rng.uniform(0, 3, nz).tolist(), q='DL')
+        t0 = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b'\n')
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - t0)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(port, nclients, nrequests, nz):
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client(port, nrequests, nz, latencies, seed)
+                           for seed in range(nclients)])
+    return np.array(latencies), time.perf_counter() - t0
+
+
+def run(nclients, nrequests, nz, max_batch, max_delay):
+    port = free_port()
+    process = start_server(port, max_batch, max_delay)
+    try:
+        latencies, seconds = asyncio.run(load(port, nclients, nrequests, nz))
+    finally:
+        process.terminate()
+        process.wait()
+    return dict(p50=np.percentile(latencies, 50),
+                p99=np.percentile(latencies, 99),
+                requests_per_second=len(latencies) / seconds,
+                redshifts_per_second=nz * len(latencies) / seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=200,
+                        help="requests per client (default 200)")
+    parser.add_argument('--nz', type=int, default=8,
+                        help="redshifts per request (default 8)")
+    parser.add_argument('--max-delay', type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    print("%d clients x %d requests of %d redshifts"
+          % (args.clients, args.requests, args.nz))
+    print("%-10s %10s %10s %12s %14s"
+          % ("mode", "p50 (ms)", "p99 (ms)", "requests/s", "redshifts/s"))
+    for mode, max_batch, max_delay in (('batched', 2 ** 16, args.max_delay),
+                                       ('unbatched', 1, 0.0)):
+        r = run(args.clients, args.requests, args.nz, max_batch, max_delay)
+        print("%-10s %10.3f %10.3f %12.0f %14.0f"
+              % (mode, 1e3 * r['p50'], 1e3 * r['p99'],
+                 r['requests_per_second'], r['redshifts_per_second']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Per-worker memory and startup of private versus shared distance tables
+
+Run from the HW8 directory:
+
+    python benchmarks/bench_shared.py [n_workers]
+
+Starts a 'spawn' pool (fresh interpreters, as on macOS and Windows) in
+which every worker either builds its own table or attaches to one
+published with Cosmology.share_table, and reports the private memory
+each worker gained (Linux /proc accounting) and the time it took.
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cosmology import Cosmology, table_store
+
+# measure building, not loading from disk, in the parent and the workers
+table_store.maxbytes = 0
+
+# a large table, so its cost stands out from the interpreter's
+PARAMS = dict(OmegaM=0.3, h=0.7, backend='table', zmax=1e5, rtol=1e-12)
+
+
+def private_bytes():
+    """Private (unshared) memory of this process, in bytes"""
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean', 'Private_Dirty')):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def worker(shared):
+    cosmo = Cosmology(**PARAMS)
+    z = np.random.RandomState(os.getpid()).uniform(0, 3, 10 ** 5)
+    before = private_bytes()
+    t0 = time.time()
+    if shared is None:
+        cosmo.table
+    else:
+        cosmo.attach_table(shared)
+    seconds = time.time() - t0
+    cosmo.mu(1.0)
+    nbytes = private_bytes() - before
+    cosmo.mu(z)
+    return nbytes, seconds
+
+
+def main(n_workers=4):
+    context = multiprocessing.get_context('spawn')
+    cosmo = Cosmology(**PARAMS)
+    print("table of %d points (%d bytes of grid), %d workers"
+          % (cosmo.table.n + 1, cosmo.table.y.nbytes * 2, n_workers))
+    print("%-8s %18s %14s" % ("table", "private / worker", "setup (ms)"))
+    with cosmo.share_table() as shared:
+        for mode, arg in (('private', None), ('shared', shared)):
+            with context.Pool(n_workers) as pool:
+                results = pool.map(worker, [arg] * n_workers, chunksize=1)
+            nbytes, seconds = np.mean(results, axis=0)
+            print("%-8s %18.0f %14.2f" % (mode, nbytes, 1e3 * seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,216 @@
+"""Speed and accuracy of every HW8 cosmology package in the repository
+
+Each ``<student>/HW8/cosmology`` package is imported in its own Python
+process, so the identically named packages cannot shadow one another and
+an implementation that fails to import, raises or hangs only loses its
+own row.  Every implementation is run on the shared DC_RESULTS and
+MU_RESULTS tables of the test suite and on arrays of random redshifts,
+and the results are summarized in one table:
+
+    python benchmarks/compare_implementations.py
+    python benchmarks/compare_implementations.py --size 1e5 -o impls.json
+
+Columns are the scalar DC latency, the DC throughput on the random array
+(passed whole when the implementation accepts arrays, element by element
+otherwise), the number of failed table rows and exceptions, the largest
+absolute error on the tables and the largest relative error of DC and mu
+against the closed-form flat Lambda-CDM result of this package's
+'analytic' backend, which shares no code with the quadrature kernels.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..', '..', '..'))
+# largest number of redshifts evaluated one at a time; throughput of
+# scalar-only implementations is measured on this many
+LOOP_MAX = 10 ** 4
+# absolute tolerance of the shared tables, as in the test suite
+ATOL = 0.01
+
+
+def find_packages(root=ROOT):
+    """Map each student to the directory holding their cosmology package"""
+    packages = {}
+    for init in glob.glob(os.path.join(root, '*', '*', 'cosmology',
+                                       '__init__.py')):
+        hw = os.path.dirname(os.path.dirname(init))
+        if os.path.basename(hw).lower() == 'hw8':
+            packages[os.path.basename(os.path.dirname(hw))] = hw
+    return packages
+
+
+def redshifts(size, seed):
+    """The random redshifts, identical in every process"""
+    return np.random.RandomState(seed).uniform(0, 3, int(size))
+
+
+def evaluate(method, z):
+    """Call method on the array z, or on each element if that fails
+
+    Returns the result and whether the array was accepted whole.
+    """
+    try:
+        y = np.asarray(method(z), dtype=float)
+        if y.shape == z.shape:
+            return y, True
+    except Exception:
+        pass
+    z = z[:LOOP_MAX]
+    return np.array([method(zi) for zi in z], dtype=float), False
+
+
+def worker(path, tables, size, seed):
+    """Run in a child process: measure the package found in path"""
+    result = dict(error=None, failures=0, table_error=0.0)
+    sys.path.insert(0, path)
+    t0 = time.time()
+    try:
+        from cosmology import Cosmology
+    except Exception as e:
+        result['error'] = 'import: %s: %s' % (type(e).__name__, e)
+        return result
+    result['import_seconds'] = time.time() - t0
+
+    for name, rows in sorted(tables.items()):
+        for OmegaM, h, z, expected in rows:
+            try:
+                value = getattr(Cosmology(OmegaM=OmegaM, h=h), name)(z)
+                err = abs(float(value) - expected)
+            except Exception:
+                err = np.inf
+            if not err <= ATOL:
+                result['failures'] += 1
+            result['table_error'] = max(result['table_error'], err)
+
+    try:
+        cosmo = Cosmology(OmegaM=0.3, h=0.7)
+        z = redshifts(size, seed)
+        zscalar = z[:200].tolist()
+        t0 = time.time()
+        for zi in zscalar:
+            cosmo.DC(zi)
+        result['scalar_seconds'] = (time.time() - t0) / len(zscalar)
+
+        t0 = time.time()
+        DC, vectorized = evaluate(cosmo.DC, z)
+        seconds = time.time() - t0
+        result.update(vectorized=vectorized, points=len(DC),
+                      rows_per_second=len(DC) / seconds,
+                      DC=DC.tolist(), mu=evaluate(cosmo.mu, z)[0].tolist())
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+    return result
+
+
+def run(packages, size=10 ** 5, seed=0, timeout=600):
+    """Measure every package in a subprocess and compare to the reference"""
+    sys.path.insert(0, os.path.join(HERE, '..'))
+    from cosmology import Cosmology
+    from cosmology.tests.test_cosmology import DC_RESULTS, MU_RESULTS
+    tables = dict(DC=DC_RESULTS, mu=MU_RESULTS)
+
+    reference = Cosmology(OmegaM=0.3, h=0.7, backend='analytic')
+    z = redshifts(size, seed)
+
+    results = {}
+    for name, path in sorted(packages.items()):
+        command = [sys.executable, os.path.abspath(__file__), '--worker',
+                   path, '--size', str(size), '--seed', str(seed)]
+        try:
+            output = subprocess.run(command, input=json.dumps(tables),
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    universal_newlines=True, timeout=timeout)
+            result = json.loads(output.stdout)
+        except subprocess.TimeoutExpired:
+            result = dict(error='timed out after %d s' % timeout)
+        except ValueError:
+            lines = output.stderr.strip().splitlines() or ['no output']
+            result = dict(error='crashed: %s' % lines[-1])
+
+        # relative error against the reference on the points evaluated
+        for quantity in ('DC', 'mu'):
+            if quantity in result:
+                value = np.array(result.pop(quantity), dtype=float)
+                exact = getattr(reference, quantity)(z[:len(value)])
+                ok = exact != 0
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    err = abs(value[ok] - exact[ok]) / abs(exact[ok])
+                result[quantity + '_error'] = float(np.max(err)) \
+                    if np.all(np.isfinite(err)) else np.inf
+        result['path'] = os.path.relpath(path, ROOT)
+        results[name] = result
+        sys.stderr.write("%s done\n" % name)
+    return results
+
+
+def report(results):
+    print("%-12s %11s %13s %5s %9s %9s %9s  %s"
+          % ("package", "scalar (us)", "DC rows/s", "fail", "table err",
+             "DC rel", "mu rel", "notes"))
+    # fastest first, failed imports last
+    order = sorted(results, key=lambda name:
+                   -results[name].get('rows_per_second', -1))
+    for name in order:
+        r = results[name]
+        notes = r['error'] or ''
+        if 'vectorized' in r and not r['vectorized']:
+            notes = ('loop over %d points' % r['points']
+                     + ('; ' + notes if notes else ''))
+        if 'import_seconds' not in r:
+            print("%-12s %11s %13s %5s %9s %9s %9s  %s"
+                  % ((name,) + ('-',) * 6 + (notes,)))
+            continue
+        print("%-12s %11s %13s %5d %9.2g %9s %9s  %s"
+              % (name,
+                 '%.2f' % (1e6 * r['scalar_seconds'])
+                 if 'scalar_seconds' in r else '-',
+                 '%.4g' % r['rows_per_second']
+                 if 'rows_per_second' in r else '-',
+                 r['failures'], r['table_error'],
+                 '%.2g' % r['DC_error'] if 'DC_error' in r else '-',
+                 '%.2g' % r['mu_error'] if 'mu_error' in r else '-',
+                 notes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=float, default=1e5,
+                        help="random redshifts per implementation "
+                             "(default 1e5)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="seconds allowed per implementation")
+    parser.add_argument('--packages', nargs='+',
+                        help="students to include (default all)")
+    parser.add_argument('-o', '--output', help="also write JSON results")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    size = int(args.size)
+
+    if args.worker:
+        tables = json.load(sys.stdin)
+        json.dump(worker(args.worker, tables, size, args.seed), sys.stdout)
+        return 0
+
+    packages = find_packages()
+    if args.packages:
+        packages = dict((name, packages[name]) for name in args.packages)
+    results = run(packages, size, args.seed, args.timeout)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
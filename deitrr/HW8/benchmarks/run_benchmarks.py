@@ -0,0 +1,185 @@
+"""Benchmark suite for the cosmology package
+
+Times DC, DM, DA, DL and mu for scalar calls and for arrays of 1e2 to
+1e7 redshifts with each backend, along with instance construction, and
+records the peak memory of every case.  The scalar quad calls are timed
+again with the compiled integrand of cosmology.build_library(), as
+backend 'quad-cc' (skipped if no C compiler is available).  Results are
+written as JSON so that revisions can be compared:
+
+    python benchmarks/run_benchmarks.py -o bench.json
+    python benchmarks/run_benchmarks.py --compare old.json new.json
+
+Runs offline; the process-wide integral cache and the on-disk table
+store are disabled so that every call does its full work.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+import cosmology
+from cosmology import Cosmology, build_library, integral_cache
+from cosmology import lowlevel
+from cosmology.cosmology import BACKENDS
+from cosmology.store import table_store
+
+METHODS = ('DC', 'DM', 'DA', 'DL', 'mu')
+SIZES = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+
+
+def best_time(func, repeat, number=1):
+    """Best mean wall time per call over several repeats, in seconds"""
+    best = np.inf
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        for j in range(number):
+            func()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def peak_memory(func):
+    """Peak memory allocated while running func, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def revision():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=HERE, stderr=subprocess.STDOUT)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scalar_results(cosmo, label, zscalar, repeat):
+    """Time 100 scalar calls of each method, per call"""
+    results = []
+    for method in METHODS:
+        func = getattr(cosmo, method)
+
+        def scalar():
+            for z in zscalar:
+                func(z)
+        results.append(dict(backend=label, method=method, size=1,
+                            seconds=best_time(scalar, repeat) / 100,
+                            peak_bytes=peak_memory(scalar)))
+    return results
+
+
+def run(backends=BACKENDS, sizes=SIZES, repeat=3):
+    integral_cache.maxbytes = 0
+    table_store.maxbytes = 0
+    rng = np.random.RandomState(42)
+    results = []
+
+    for backend in backends:
+        # construction, including any table or ODE build on first use
+        def construct():
+            Cosmology(OmegaM=0.3, h=0.7, backend=backend).DC(0.5)
+        results.append(dict(backend=backend, method='construct', size=1,
+                            seconds=best_time(construct, repeat),
+                            peak_bytes=peak_memory(construct)))
+
+        cosmo = Cosmology(OmegaM=0.3, h=0.7, backend=backend)
+        cosmo.DC(0.5)
+        zscalar = rng.uniform(0, 3, 100).tolist()
+        results.extend(scalar_results(cosmo, backend, zscalar, repeat))
+        for method in METHODS:
+            func = getattr(cosmo, method)
+            for size in sizes:
+                z = rng.uniform(0, 3, size)
+                number = max(1, 10 ** 4 // size)
+                seconds = best_time(lambda: func(z), repeat, number)
+                results.append(dict(backend=backend, method=method,
+                                    size=size, seconds=seconds,
+                                    rows_per_second=size / seconds,
+                                    peak_bytes=peak_memory(lambda: func(z))))
+                sys.stderr.write("%-8s %-4s %9d  %.4g s\n"
+                                 % (backend, method, size, seconds))
+
+        # the same scalar calls with the compiled integrand; a new
+        # instance, since the integrand is fixed at the first scalar call
+        if backend == 'quad' and build_library() is not None:
+            try:
+                cosmo = Cosmology(OmegaM=0.3, h=0.7, backend=backend)
+                cosmo.DC(0.5)
+                results.extend(scalar_results(cosmo, 'quad-cc', zscalar,
+                                              repeat))
+            finally:
+                lowlevel._library = None
+    return results
+
+
+def compare(old, new, threshold=1.2):
+    """Print cases that got slower than threshold between two runs"""
+    before = dict(((r['backend'], r['method'], r['size']), r['seconds'])
+                  for r in old['results'])
+    print("%-8s %-9s %9s %12s %12s %8s"
+          % ("backend", "method", "size", "old (s)", "new (s)", "ratio"))
+    nslow = 0
+    for r in new['results']:
+        key = (r['backend'], r['method'], r['size'])
+        if key not in before:
+            continue
+        ratio = r['seconds'] / before[key]
+        flag = ''
+        if ratio > threshold:
+            flag = '  SLOWER'
+            nslow += 1
+        print("%-8s %-9s %9d %12.4g %12.4g %8.2f%s"
+              % (key + (before[key], r['seconds'], ratio, flag)))
+    return nslow
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', default='benchmarks.json',
+                        help="JSON file for the results")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS),
+                        choices=BACKENDS)
+    parser.add_argument('--max-size', type=float, default=1e7,
+                        help="largest array size (default 1e7)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        return 1 if compare(old, new) else 0
+
+    sizes = [size for size in SIZES if size <= args.max_size]
+    results = run(args.backends, sizes, args.repeat)
+    package = os.path.abspath(os.path.dirname(cosmology.__file__))
+    output = dict(revision=revision(),
+                  timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  python=platform.python_version(),
+                  numpy=np.__version__,
+                  platform=platform.platform(),
+                  package=package,
+                  results=results)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,50 @@ This modules helps you measure the universe.
 
 Classes:
 - Cosmology : class whose methods are cosmological parameters/distances
+- DistanceTable : error-bounded interpolation table of a distance integral
+- IntegralCache : thread-safe LRU cache of distance integrals
+- TableStore : on-disk store of distance tables with size eviction
+- SharedTable : distance table published in shared memory for workers
+
+Functions:
+- distance_grid : distance measures over a grid of (OmegaM, h, z)
+- annotate : stream distance columns for a redshift catalog to a file
+- build_library : compile the C integrand used for scalar quad integrals
+
+Objects:
+- integral_cache : process-wide LRU cache of distance integrals
+- table_store : on-disk store of the tables built by Cosmology
 
 """
-# We'll import the Cosmology class using
-# a "relative import":
-from .cosmology import Cosmology
\ No newline at end of file
+# The names below are imported from their submodules on first access
+# (PEP 562), so that "import cosmology" stays fast and a program only
+# pays for NumPy, SciPy or multiprocessing once it uses them.
+import importlib
+
+_SUBMODULES = {'Cosmology': 'cosmology',
+               'distance_grid': 'cosmology',
+               'DistanceTable': 'table',
+               'IntegralCache': 'cache',
+               'integral_cache': 'cache',
+               'TableStore': 'store',
+               'table_store': 'store',
+               'SharedTable': 'shared',
+               'annotate': 'catalog',
+               'build_library': 'lowlevel'}
+
+__all__ = sorted(_SUBMODULES)
+
+
+def __getattr__(name):
+    if name not in _SUBMODULES:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    module = importlib.import_module('.' + _SUBMODULES[name], __name__)
+    value = getattr(module, name)
+    # later lookups find the name directly
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
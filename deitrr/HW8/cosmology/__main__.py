@@ -0,0 +1,68 @@
+"""Command line batch distance conversion
+
+Reads redshifts from a file or stdin and writes the requested distance
+measures to a file or stdout, chunk by chunk:
+
+    python -m cosmology --OmegaM 0.3 --h 0.7 -q DL mu < z.txt > out.csv
+    python -m cosmology -q mu -i catalog.npy -o distances.npy
+
+SciPy is only imported if the chosen backend needs it.
+"""
+import argparse
+import sys
+
+from .catalog import MEASURES, annotate
+from .cosmology import BACKENDS, Cosmology
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cosmology',
+        description="Convert redshifts to cosmological distances "
+                    "(Hogg 1999).")
+    parser.add_argument('--OmegaM', type=float, default=0.3,
+                        help="matter density parameter (default 0.3)")
+    parser.add_argument('--OmegaK', type=float, default=0.0,
+                        help="curvature density parameter (default 0)")
+    parser.add_argument('--h', type=float, default=0.7,
+                        help="dimensionless Hubble constant (default 0.7)")
+    parser.add_argument('-q', '--quantities', nargs='+', default=['DL'],
+                        choices=MEASURES,
+                        help="measures to compute (default DL)")
+    parser.add_argument('-i', '--input', default='-',
+                        help="input .npy, raw binary or text file "
+                             "(default stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output .npy, raw binary or text file "
+                             "(default stdout)")
+    parser.add_argument('--zcol', default='0',
+                        help="redshift column index or header name "
+                             "(default 0)")
+    parser.add_argument('--delimiter', default=',',
+                        help="text column delimiter (default ',')")
+    parser.add_argument('--chunksize', type=int, default=2 ** 20,
+                        help="rows per chunk (default 1048576)")
+    parser.add_argument('--backend', default='auto',
+                        choices=('auto',) + BACKENDS,
+                        help="integration backend (default auto)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="do not print timing statistics")
+    args = parser.parse_args(argv)
+
+    # 'auto' picks the interpolation table, the fastest for batches: it
+    # is built once with numpy only and every lookup is O(1)
+    backend = 'table' if args.backend == 'auto' else args.backend
+    zcol = int(args.zcol) if args.zcol.lstrip('-').isdigit() else args.zcol
+    cosmo = Cosmology(OmegaM=args.OmegaM, h=args.h, backend=backend,
+                      OmegaK=args.OmegaK)
+    infile = sys.stdin if args.input == '-' else args.input
+    outfile = sys.stdout if args.output == '-' else args.output
+
+    annotate(infile, outfile, cosmo, columns=args.quantities, zcol=zcol,
+             chunksize=args.chunksize, delimiter=args.delimiter,
+             verbose=not args.quiet)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+/* Inverse of Hogg eqn 14, in the scipy.LowLevelCallable signature
+ *
+ *     double func(int n, double *xx, void *user_data)
+ *
+ * user_data points to the density parameters {OmegaM, OmegaK, OmegaL}.
+ */
+#include <math.h>
+
+double einv(int n, double *xx, void *user_data)
+{
+    const double *omega = (const double *)user_data;
+    double zp1 = 1.0 + xx[0];
+    return 1.0 / sqrt((omega[0] * zp1 + omega[1]) * zp1 * zp1 + omega[2]);
+}
@@ -0,0 +1,67 @@
+"""Closed-form comoving distance for flat Lambda-CDM
+
+For OmegaK = 0 the comoving distance integral (Hogg eqn 15) reduces to
+
+    DC / DH = [F(1+z) - F(1)] / sqrt(OmegaL)
+
+with F(u) = u 2F1(1/3, 1/2; 4/3; -(OmegaM/OmegaL) u^3), since
+d/du [u 2F1(1/3, 1/2; 4/3; -s u^3)] = (1 + s u^3)^(-1/2).
+"""
+import numpy as np
+
+# below this redshift F(1+z) - F(1) loses digits to cancellation, so the
+# (very smooth) integrand is summed with fixed Gauss-Legendre instead
+ZSMALL = 0.1
+_NODES, _WEIGHTS = np.polynomial.legendre.leggauss(8)
+
+
+def _F(u, s):
+    # scipy is imported on first use to keep startup fast
+    from scipy import special
+    return u * special.hyp2f1(1. / 3, 0.5, 4. / 3, -s * u ** 3)
+
+
+def flat_comoving_integral(z, OmegaM):
+    """Dimensionless comoving distance DC / DH of a flat universe
+
+    Parameters
+    ----------
+    z : float or array_like
+        redshift
+    OmegaM : float
+        Matter density parameter, 0 < OmegaM <= 1 (OmegaL = 1 - OmegaM)
+
+    Returns
+    -------
+    y : float or ndarray
+        integral of 1 / E(z) from 0 to z
+
+    Examples
+    --------
+    >>> flat_comoving_integral(1.0, 0.3) * 299792.458 / 70
+    3303.828805887...
+    """
+    OmegaL = 1. - OmegaM
+    if OmegaL < 0 or OmegaM <= 0:
+        raise ValueError("closed form requires 0 < OmegaM <= 1")
+    zarr = np.asarray(z, dtype=float)
+
+    if OmegaL == 0:
+        # Einstein-de Sitter: 2 (1 - 1/sqrt(1+z)), written without
+        # cancellation at small z
+        y = -2 * np.expm1(-0.5 * np.log1p(zarr))
+    else:
+        s = OmegaM / OmegaL
+        y = (_F(1 + zarr, s) - _F(1., s)) / np.sqrt(OmegaL)
+
+        small = np.abs(zarr) < ZSMALL
+        if np.any(small):
+            zs = zarr[small]
+            x = 0.5 * zs[:, None] * (1 + _NODES)
+            Einv = 1. / np.sqrt(OmegaM * (1 + x) ** 3 + OmegaL)
+            y = np.array(y, copy=True)
+            y[small] = 0.5 * zs * np.dot(Einv, _WEIGHTS)
+
+    if np.ndim(y) == 0:
+        return float(y)
+    return y
@@ -0,0 +1,101 @@
+"""Process-wide cache of distance integrals shared by Cosmology instances"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .quadrature import is_scalar
+
+# rough memory cost of a cached scalar (key tuple, float and dict slot)
+SCALAR_NBYTES = 200
+
+
+class IntegralCache(object):
+    """Thread-safe LRU cache with a bounded memory budget
+
+    Entries are keyed by the density parameters of a cosmology together
+    with the redshift (or a hash of a redshift array), so new Cosmology
+    instances with previously seen parameters reuse earlier integrations.
+    The least recently used entries are evicted once the cached values
+    exceed maxbytes.
+
+    Parameters
+    ----------
+    maxbytes : int, optional
+        memory budget for the cached values. Default = 64 MB.
+        Set to 0 to disable caching.
+
+    Attributes
+    ----------
+    hits, misses : int
+        number of successful and failed lookups
+    nbytes : int
+        current memory used by the cached values
+    """
+    def __init__(self, maxbytes=64 * 2 ** 20):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def key(params, z):
+        """Cache key for a parameter tuple and a redshift or array"""
+        if is_scalar(z):
+            return params + (float(z),)
+        z = np.ascontiguousarray(z, dtype=float)
+        return params + (z.shape, hashlib.sha1(z).hexdigest())
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing"""
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value[0]
+
+    def put(self, key, value, nbytes=None):
+        """Store value under key, evicting old entries to fit the budget"""
+        copy = nbytes is None and isinstance(value, np.ndarray)
+        if nbytes is None:
+            nbytes = value.nbytes if copy else SCALAR_NBYTES
+        if nbytes > self.maxbytes:
+            return
+        if copy:
+            value = value.copy()
+            value.flags.writeable = False
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._data[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.maxbytes:
+                self.nbytes -= self._data.popitem(last=False)[1][1]
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.nbytes = self.hits = self.misses = 0
+
+    def stats(self):
+        """Dictionary of the cache counters"""
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        entries=len(self._data), nbytes=self.nbytes,
+                        maxbytes=self.maxbytes)
+
+
+# the cache shared by all Cosmology instances in this process
+integral_cache = IntegralCache()
@@ -0,0 +1,251 @@
+"""Streaming, out-of-core annotation of redshift catalogs
+
+Redshifts are read from a CSV file, a .npy file or a raw binary file in
+fixed-size chunks, the requested distance columns are computed with a
+single integration per chunk (Cosmology.distances), and the results are
+appended to the output file, so memory use does not depend on the size
+of the catalog.
+
+Formats are chosen from the file extension:
+
+- ``.npy`` : NumPy array file, memory-mapped.  1-D arrays are the
+  redshifts; for 2-D arrays zcol selects the column.
+- ``.bin``, ``.dat``, ``.f8`` : raw binary, memory-mapped, one redshift
+  of the given dtype per element (native float64 by default).
+- anything else, or an open file object : delimited text with an
+  optional header line naming the columns.
+
+Output has the redshift in the first column followed by the requested
+measures, in the same format family.
+"""
+import itertools
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from .cosmology import Cosmology
+
+BINARY_EXTENSIONS = ('.bin', '.dat', '.f8')
+MEASURES = ('DC', 'DM', 'DA', 'DL', 'mu')
+
+
+def _format(f):
+    if not isinstance(f, str):
+        return 'text'
+    ext = os.path.splitext(f)[1].lower()
+    if ext == '.npy':
+        return 'npy'
+    if ext in BINARY_EXTENSIONS:
+        return 'binary'
+    return 'text'
+
+
+def peak_rss():
+    """Peak resident set size of this process, in bytes"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else 1024 * rss
+
+
+def _read_text(f, zcol, delimiter, chunksize):
+    """Yield chunks of redshifts from a delimited text file object"""
+    lines = iter(f)
+    first = next(lines, None)
+    if first is None:
+        return
+    fields = [field.strip() for field in first.split(delimiter)]
+    try:
+        float(fields[zcol if isinstance(zcol, int) else 0])
+        is_header = not isinstance(zcol, int)
+    except ValueError:
+        is_header = True
+    if is_header:
+        if not isinstance(zcol, int):
+            zcol = fields.index(zcol)
+    else:
+        lines = itertools.chain([first], lines)
+
+    while True:
+        chunk = list(itertools.islice(lines, chunksize))
+        if not chunk:
+            return
+        yield np.loadtxt(chunk, delimiter=delimiter, usecols=(zcol,),
+                         ndmin=1)
+
+
+def read_redshifts(infile, zcol=0, chunksize=2 ** 20, delimiter=',',
+                   dtype='f8'):
+    """Iterate over the redshifts of a catalog in chunks
+
+    Parameters
+    ----------
+    infile : string or file
+        path to a .npy, raw binary or text file, or an open text file
+    zcol : int or string, optional
+        column holding the redshift: an index, or a name from a text
+        header.  Default = 0
+    chunksize : int, optional
+        number of rows per chunk. Default = 2 ** 20
+    delimiter : string, optional
+        text column delimiter. Default = ','
+    dtype : data-type, optional
+        element type of raw binary input. Default = 'f8'
+
+    Returns
+    -------
+    chunks : iterator of ndarray
+        one-dimensional float arrays of at most chunksize redshifts
+    """
+    fmt = _format(infile)
+    if fmt == 'text':
+        if isinstance(infile, str):
+            with open(infile) as f:
+                for chunk in _read_text(f, zcol, delimiter, chunksize):
+                    yield chunk
+        else:
+            for chunk in _read_text(infile, zcol, delimiter, chunksize):
+                yield chunk
+        return
+
+    if fmt == 'npy':
+        data = np.load(infile, mmap_mode='r')
+        if data.ndim == 2:
+            data = data[:, zcol]
+    else:
+        data = np.memmap(infile, dtype=dtype, mode='r')
+    for i in range(0, len(data), chunksize):
+        yield np.asarray(data[i:i + chunksize], dtype=float)
+
+
+def count_rows(infile, delimiter=',', dtype='f8', zcol=0):
+    """Number of catalog rows
+
+    .npy and raw binary files are counted without loading the data;
+    text files are read through, so an open text file is consumed.
+    """
+    fmt = _format(infile)
+    if fmt == 'npy':
+        return len(np.load(infile, mmap_mode='r'))
+    if fmt == 'binary':
+        return os.path.getsize(infile) // np.dtype(dtype).itemsize
+    return sum(len(chunk) for chunk in
+               read_redshifts(infile, zcol, delimiter=delimiter))
+
+
+def _spool_to_npy(spool, outfile, nrows, ncols, chunksize):
+    """Copy float rows from a raw binary file into a new .npy file"""
+    out = np.lib.format.open_memmap(outfile, mode='w+', dtype=float,
+                                    shape=(nrows, ncols))
+    with open(spool, 'rb') as f:
+        for i in range(0, nrows, chunksize):
+            block = np.fromfile(f, dtype=float, count=chunksize * ncols)
+            out[i:i + chunksize] = block.reshape(-1, ncols)
+    out.flush()
+    del out
+
+
+def annotate(infile, outfile, cosmo=None, columns=('DL',), zcol=0,
+             chunksize=2 ** 20, delimiter=',', dtype='f8', verbose=False):
+    """Compute distance columns for a catalog, chunk by chunk
+
+    Parameters
+    ----------
+    infile : string or file
+        input catalog (see read_redshifts for the formats)
+    outfile : string or file
+        output path (.npy, raw binary or text) or open text file
+    cosmo : Cosmology, optional
+        cosmology to use. Default is Cosmology(backend='table')
+    columns : sequence of strings, optional
+        measures to compute, from 'DC', 'DM', 'DA', 'DL', 'mu'.
+        Default = ('DL',)
+    zcol, chunksize, delimiter, dtype :
+        passed to read_redshifts
+    verbose : bool, optional
+        if True, print the run statistics to stderr
+
+    Returns
+    -------
+    stats : dict
+        rows, seconds, rows_per_second and peak_rss (bytes)
+
+    Notes
+    -----
+    The rows of a text catalog are only known once it has been read, so
+    for .npy output they are first written to a raw temporary file next
+    to outfile and copied into the .npy file at the end.  Text input,
+    including a pipe such as stdin, is read once.
+
+    Examples
+    --------
+    >>> stats = annotate('catalog.npy', 'distances.csv',
+    ...                  columns=['DL', 'mu'])  # doctest: +SKIP
+    """
+    for name in columns:
+        if name not in MEASURES:
+            raise ValueError("unknown distance measure %r" % name)
+    if cosmo is None:
+        cosmo = Cosmology(backend='table')
+    columns = list(columns)
+    ncols = 1 + len(columns)
+    t0 = time.time()
+
+    fmt = _format(outfile)
+    spool = None
+    if fmt == 'npy' and _format(infile) == 'text':
+        import tempfile
+        fd, spool = tempfile.mkstemp(
+            suffix='.tmp', dir=os.path.dirname(os.path.abspath(outfile)))
+        out = os.fdopen(fd, 'wb')
+        fmt = 'binary'
+    elif fmt == 'npy':
+        nrows = count_rows(infile, delimiter, dtype, zcol)
+        out = np.lib.format.open_memmap(outfile, mode='w+', dtype=float,
+                                        shape=(nrows, ncols))
+    elif fmt == 'binary':
+        out = open(outfile, 'wb')
+    elif isinstance(outfile, str):
+        out = open(outfile, 'w')
+    else:
+        out = outfile
+    if fmt == 'text':
+        out.write(delimiter.join(['z'] + columns) + '\n')
+
+    rows = 0
+    try:
+        for z in read_redshifts(infile, zcol, chunksize, delimiter, dtype):
+            d = cosmo.distances(z, which=columns)
+            block = np.column_stack([z] + [d[name] for name in columns])
+            if fmt == 'npy':
+                out[rows:rows + len(z)] = block
+            elif fmt == 'binary':
+                block.tofile(out)
+            else:
+                np.savetxt(out, block, fmt='%.10g', delimiter=delimiter)
+            rows += len(z)
+    finally:
+        if fmt == 'npy':
+            out.flush()
+            del out
+        elif out is not outfile:
+            out.close()
+        if spool is not None and sys.exc_info()[0] is not None:
+            os.remove(spool)
+    if spool is not None:
+        try:
+            _spool_to_npy(spool, outfile, rows, ncols, chunksize)
+        finally:
+            os.remove(spool)
+
+    seconds = time.time() - t0
+    stats = dict(rows=rows, seconds=seconds,
+                 rows_per_second=rows / seconds if seconds > 0 else np.inf,
+                 peak_rss=peak_rss())
+    if verbose:
+        sys.stderr.write("%(rows)d rows in %(seconds).3f s "
+                         "(%(rows_per_second).4g rows/s), "
+                         "peak RSS %(peak_rss)d bytes\n" % stats)
+    return stats
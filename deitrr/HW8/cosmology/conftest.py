@@ -0,0 +1,23 @@
+"""pytest configuration for the doctests
+
+The examples build tables, which are saved to the cache directory; point
+it at a temporary directory so they neither read nor leave files in the
+user's cache.  (tests/test_cosmology.py does the same in setup_module.)
+"""
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def cache_dir(tmp_path_factory):
+    from .cache import integral_cache
+    environ = os.environ.get('COSMOLOGY_CACHE_DIR')
+    os.environ['COSMOLOGY_CACHE_DIR'] = str(tmp_path_factory.mktemp('cache'))
+    integral_cache.clear()
+    yield os.environ['COSMOLOGY_CACHE_DIR']
+    if environ is None:
+        del os.environ['COSMOLOGY_CACHE_DIR']
+    else:
+        os.environ['COSMOLOGY_CACHE_DIR'] = environ
+    integral_cache.clear()
@@ -1,9 +1,115 @@
+import contextlib
+
 import numpy as np
-from scipy import integrate
+
+from .analytic import flat_comoving_integral
+from .cache import integral_cache
+from .curvature import comoving_volume, cosn, sinn
+from .instrument import CallStats, instrumented_class
+from .ode import DistanceODE
+from .quadrature import cumulative_integral, gauss_legendre_integral, \
+    is_scalar
+from .store import table_store
+from .table import DistanceTable
 
 # speed of light
 C = 299792.458  # km/s
 
+# Hubble time in Gyr for H0 = 1 km/s/Mpc (Mpc in km / Gyr in s)
+TH1 = 3.0856775814913673e19 / 3.15576e16
+
+# gravitational constant
+G = 4.300917270e-9  # Mpc (km/s)^2 / Msun
+
+# c^2 / (4 pi G) of the lensing critical surface density, Msun / Mpc
+SIGMA_CRIT_SCALE = C ** 2 / (4 * np.pi * G)
+
+# distance methods that map() can evaluate
+MEASURES = ('DC', 'DM', 'DA', 'DL', 'mu', 'tL', 'VC')
+
+# methods available for evaluating the comoving distance integral
+BACKENDS = ('quad', 'table', 'analytic', 'gauss', 'ode')
+
+# accuracy tiers: the cheapest backend meeting each relative tolerance
+ACCURACY = {'fast': ('table', 1e-4),
+            'default': ('quad', 1e-8),
+            'precise': ('quad', 1e-12)}
+
+# relative accuracy of the closed-form backend, limited by hyp2f1
+ANALYTIC_RTOL = 1e-11
+
+# smallest relative tolerance quad accepts
+MIN_RTOL = 50 * np.finfo(float).eps
+
+
+def distance_grid(quantity, OmegaM, h, z, **kwargs):
+    """Evaluate a distance measure over a grid of (OmegaM, h, z)
+
+    Every distance scales with h only through DH = C / (100 h), so the
+    comoving distance integral is evaluated once per unique OmegaM and
+    the h dependence is broadcast afterwards.
+
+    Parameters
+    ----------
+    quantity : string
+        one of 'DC', 'DM', 'DA', 'DL', 'mu'
+    OmegaM : array_like
+        matter density parameters, shape (nOmegaM,)
+    h : array_like
+        dimensionless Hubble constants, shape (nh,)
+    z : array_like
+        redshifts, shape (nz,)
+    **kwargs :
+        further arguments passed to Cosmology (e.g. backend)
+
+    Returns
+    -------
+    y : ndarray
+        the measure, with shape (nOmegaM, nh, nz)
+
+    Examples
+    --------
+    >>> distance_grid('mu', [0.2, 0.3], [0.6, 0.7], [0.5, 1.0]).shape
+    (2, 2, 2)
+    """
+    if quantity not in ('DC', 'DM', 'DA', 'DL', 'mu'):
+        raise ValueError("quantity must be one of DC, DM, DA, DL, mu")
+    OmegaM = np.atleast_1d(np.asarray(OmegaM, dtype=float))
+    h = np.atleast_1d(np.asarray(h, dtype=float))
+    z = np.atleast_1d(np.asarray(z, dtype=float))
+
+    # evaluate at h = 1, where DH = C / 100
+    OmegaM_unique, inverse = np.unique(OmegaM, return_inverse=True)
+    y = np.array([getattr(Cosmology(OmegaM=Om, h=1.0, **kwargs), quantity)(z)
+                  for Om in OmegaM_unique])[inverse]
+
+    if quantity == 'mu':
+        # DL scales as 1 / h, so mu shifts by -5 log10(h)
+        return y[:, None, :] - 5.0 * np.log10(h)[None, :, None]
+    return y[:, None, :] / h[None, :, None]
+
+
+def _unique_values(arrays, chunksize):
+    """Sorted unique values of arrays, read chunksize elements at a time
+
+    Memory is bounded by the number of unique values, not array sizes.
+    """
+    unique, pending, npending = np.empty(0), [], 0
+    for a in arrays:
+        for start in range(0, a.size, chunksize):
+            pending.append(np.unique(a.flat[start:start + chunksize]))
+            npending += len(pending[-1])
+            if npending > len(unique) + chunksize:
+                unique = np.unique(np.concatenate([unique] + pending))
+                pending, npending = [], 0
+    return np.unique(np.concatenate([unique] + pending))
+
+
+def _map_chunk(args):
+    """Worker for Cosmology.map: evaluate one method on one chunk"""
+    cosmo, method, z = args
+    return getattr(cosmo, method)(z)
+
 
 class Cosmology(object):
     """Cosmology class implementing Cosmological Distance Functions
@@ -17,51 +123,403 @@ class Cosmology(object):
         Matter density parameter. Default = 0.3
     h : float, optional
         dimensionless Hubble constant. Default = 0.7
-        
+    backend : string, optional
+        how the comoving distance integral is evaluated. 'quad'
+        integrates directly; 'table' builds a DistanceTable on first use
+        and serves all distances from it; 'analytic' uses the closed
+        form for flat Lambda-CDM, falling back to 'quad' otherwise;
+        'gauss' integrates every redshift independently with a batched
+        fixed-order Gauss-Legendre rule; 'ode' solves the distance ODEs
+        once with dense output and interpolates.
+    zmax : float, optional
+        upper redshift covered by a table or ODE solution. Default = 10
+    rtol : float, optional
+        relative error bound of the integration, at least MIN_RTOL
+        (50 machine epsilons).  Default is set by accuracy.
+    accuracy : string, optional
+        accuracy tier, 'fast' (rtol = 1e-4, table), 'default'
+        (rtol = 1e-8, quad) or 'precise' (rtol = 1e-12, quad).  The tier
+        supplies whichever of backend and rtol is not given; an explicit
+        rtol without a backend picks the table for rtol >= 1e-6 and quad
+        otherwise.
+    OmegaL : float, optional
+        dark energy density parameter.  Default is 1 - OmegaM - OmegaK
+    OmegaK : float, optional
+        curvature density parameter, positive for an open universe.
+        Default is 1 - OmegaM - OmegaL, or 0 (flat) if OmegaL is not
+        given either.  If both OmegaL and OmegaK are given they must
+        sum with OmegaM to 1.
+
     References
     ----------
     Hogg, D., 1999. arXiv:astro-ph/9905116v4
     """
-    def __init__(self, OmegaM=0.3, h=0.7):
-        # for now, we'll implement only
-        # a flat cosmology for simplicity
-        self.OmegaK = 0.0
-        self.OmegaM = OmegaM
-        self.OmegaL = 1. - OmegaM
+    # Instances are immutable: the parameters are fixed at construction,
+    # so results may be cached and instances hashed by value.  The
+    # underscored slots hold lazily built helpers.
+    __slots__ = ('OmegaM', 'OmegaK', 'OmegaL', 'h', 'H0', 'DH', 'tH',
+                 'backend', 'zmax', 'rtol', '_key', '_hash', '_table',
+                 '_ode', '_quad_integrand')
+
+    # whether tables and ODE solutions built by an instance are shared
+    # through integral_cache and table_store; not by instrumented
+    # copies, whose helpers call their recording _Einv
+    _share_helpers = True
+
+    def __init__(self, OmegaM=0.3, h=0.7, backend=None, zmax=10.0,
+                 rtol=None, accuracy='default', OmegaL=None, OmegaK=None):
+        if OmegaL is None:
+            OmegaK = 0.0 if OmegaK is None else OmegaK
+            OmegaL = 1. - OmegaM - OmegaK
+        elif OmegaK is None:
+            OmegaK = 1. - OmegaM - OmegaL
+            # within rounding of the sum, OmegaL = 1 - OmegaM is flat
+            if abs(OmegaK) <= 4 * np.finfo(float).eps:
+                OmegaK = 0.0
+        elif abs(OmegaM + OmegaL + OmegaK - 1) > 1e-12:
+            raise ValueError("OmegaM + OmegaL + OmegaK must equal 1")
+        if accuracy not in ACCURACY:
+            raise ValueError("accuracy must be one of %s"
+                             % (tuple(sorted(ACCURACY)),))
+        if backend is None:
+            if rtol is None:
+                backend = ACCURACY[accuracy][0]
+            else:
+                backend = 'table' if rtol >= 1e-6 else 'quad'
+        if rtol is None:
+            rtol = ACCURACY[accuracy][1]
+        elif not rtol >= MIN_RTOL:
+            raise ValueError("rtol must be at least %.3g" % MIN_RTOL)
+        if backend not in BACKENDS:
+            raise ValueError("backend must be one of %s" % (BACKENDS,))
+
+        set_ = object.__setattr__
+        # density parameters, summing to 1 (Hogg eqn 7)
+        set_(self, 'OmegaK', OmegaK)
+        set_(self, 'OmegaM', OmegaM)
+        set_(self, 'OmegaL', OmegaL)
 
         # Hubble constant, km/s/Mpc
-        self.H0 = h * 100
+        set_(self, 'h', h)
+        set_(self, 'H0', h * 100)
 
         # Hubble Distance, Mpc
-        self.DH = C / self.H0
+        set_(self, 'DH', C / self.H0)
+
+        # Hubble Time, Gyr
+        set_(self, 'tH', TH1 / self.H0)
+
+        set_(self, 'backend', backend)
+        set_(self, 'zmax', zmax)
+        set_(self, 'rtol', rtol)
+        key = (OmegaM, h, backend, zmax, rtol, OmegaL, OmegaK)
+        set_(self, '_key', key)
+        set_(self, '_hash', hash(key))
+        set_(self, '_table', None)
+        set_(self, '_ode', None)
+        set_(self, '_quad_integrand', None)
+
+    def __setattr__(self, name, value):
+        # only the lazily built helpers may change; the parameters and
+        # the _key and _hash derived from them may not
+        if name not in ('_table', '_ode', '_quad_integrand'):
+            raise AttributeError("Cosmology is immutable: cannot set %r"
+                                 % name)
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("Cosmology is immutable: cannot delete %r"
+                             % name)
+
+    def __eq__(self, other):
+        if not isinstance(other, Cosmology):
+            return NotImplemented
+        return self._key == other._key
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return ('Cosmology(OmegaM=%r, h=%r, backend=%r, zmax=%r, rtol=%r, '
+                'OmegaL=%r, OmegaK=%r)' % self._key)
+
+    def __reduce__(self):
+        # pickle by parameters only: cached tables, ODE solutions and the
+        # compiled integrand are rebuilt (or found in the cache) on demand
+        return (Cosmology, self._key[:5] + ('default',) + self._key[5:])
+
+    def _cache_key(self, kind):
+        # integral_cache key of the table or ODE solution of this model
+        return (kind, self.OmegaM, self.OmegaK, self.OmegaL, self.zmax,
+                self.rtol)
+
+    @property
+    def table(self):
+        """DistanceTable of DC / DH, built on first access
+
+        Tables are shared through the process-wide integral_cache, so
+        instances with the same density parameters reuse one table, and
+        saved to the on-disk table_store, so later processes load them
+        instead of integrating.
+        """
+        if self._table is None:
+            key = self._cache_key('table')
+            self._table = integral_cache.get(key)
+            if self._table is None:
+                saved = table_store.load(key)
+                if saved is not None:
+                    self._table = DistanceTable.from_grid(
+                        self._Einv, self.zmax, self.rtol, *saved)
+                else:
+                    self._table = DistanceTable(self._Einv, self.zmax,
+                                                self.rtol)
+                    if self._share_helpers:
+                        table_store.save(key, self._table.y, self._table.dy,
+                                         self._table.error)
+                if self._share_helpers:
+                    integral_cache.put(key, self._table, self._table.nbytes)
+        return self._table
+
+    @property
+    def ode(self):
+        """DistanceODE solution, built on first access
+
+        Solutions are shared through the process-wide integral_cache.
+        """
+        if self._ode is None:
+            key = self._cache_key('ode')
+            self._ode = integral_cache.get(key)
+            if self._ode is None:
+                self._ode = DistanceODE(self._Einv, self.OmegaK, self.zmax,
+                                        self.rtol)
+                if self._share_helpers:
+                    integral_cache.put(key, self._ode, self._ode.nbytes)
+        return self._ode
+
+    def share_table(self):
+        """Publish the distance table in shared memory
+
+        Returns a SharedTable; pass it to attach_table in other processes
+        (it pickles to the segment name) to let them read this table
+        without building or copying it.  Close it, or use it in a with
+        block, once the workers are done; the segment is unlinked then.
+
+        Returns
+        -------
+        shared : SharedTable
+        """
+        from .shared import SharedTable
+        return SharedTable(self._cache_key('table'), self.table)
+
+    def attach_table(self, shared):
+        """Use a table published with share_table by another process
+
+        The table is also placed in this process's integral_cache, so
+        every instance with the same parameters uses it.
+
+        Parameters
+        ----------
+        shared : SharedTable
+            the published table, as received by this process
+        """
+        key = self._cache_key('table')
+        if shared.key != key:
+            raise ValueError("shared table was built for other parameters")
+        self._table = shared.table(self._Einv)
+        # the grid lives in shared memory, not in this process
+        if self._share_helpers:
+            integral_cache.put(key, self._table, 0)
+
+    def _integral(self, z, return_error=False):
+        """Dimensionless comoving distance DC / DH (Hogg eqn 15)
+
+        Results are looked up in, and stored to, the process-wide
+        integral_cache keyed by the density parameters and redshift,
+        along with the relative error estimated by the backend.  With
+        return_error that error is returned too, or None if there is
+        none (see error).
+        """
+        if self.backend == 'table':
+            if return_error:
+                return self.table(z), self.table.error
+            return self.table(z)
+        if integral_cache.maxbytes <= 0 or \
+                not is_scalar(z) and np.size(z) * 8 > integral_cache.maxbytes:
+            # disabled, or too large to be cached: skip hashing the
+            # redshifts for a key
+            y, err = self._compute_integral(z)
+            return (y, err) if return_error else y
+        key = integral_cache.key((self.backend, self.rtol, self.OmegaM,
+                                  self.OmegaK, self.OmegaL), z)
+        y = integral_cache.get(key)
+        if y is None:
+            y, err = self._compute_integral(z)
+            integral_cache.put(key, y)
+            if err is not None:
+                integral_cache.put(key + ('error',), err)
+        elif return_error:
+            err = integral_cache.get(key + ('error',))
+        return (y, err) if return_error else y
+
+    def _compute_integral(self, z):
+        """DC / DH and its relative error with the selected backend
+
+        Bypasses the caches.  The error is the backend's own estimate,
+        or None for arrays integrated cumulatively.
+        """
+        if self.backend == 'analytic' and self.OmegaK == 0 \
+                and 0 < self.OmegaM <= 1:
+            return flat_comoving_integral(z, self.OmegaM), ANALYTIC_RTOL
+        if self.backend == 'gauss':
+            return gauss_legendre_integral(self._Einv, z, self.rtol)
+        if self.backend == 'ode':
+            return self.ode(z), self.rtol
+        # Arrays are integrated cumulatively in one pass over their
+        # sorted unique values.
+        if is_scalar(z):
+            if self._quad_integrand is None:
+                # plain-float version of _Einv, compiled if
+                # lowlevel.build_library() was called
+                from .lowlevel import quad_integrand
+                self._quad_integrand = quad_integrand(
+                    self.OmegaM, self.OmegaK, self.OmegaL)
+            y, abserr = self._quad(self._quad_integrand, 0, z,
+                                   return_error=True)
+            return y, abserr / abs(y) if y != 0 else 0.0
+        return cumulative_integral(self._Einv, z), None
+
+    def _quad(self, func, a, b, return_error=False):
+        """Integrate func from a to b with scipy.integrate.quad
+
+        With return_error, quad's estimate of the absolute error is
+        returned as well.
+        """
+        # scipy is imported on first use to keep startup fast
+        from scipy import integrate
+        result = integrate.quad(func, a, b, **self._quad_tolerance())
+        return result[:2] if return_error else result[0]
+
+    def _quad_tolerance(self):
+        # quad's own tolerances (1.49e-8) already meet the default rtol
+        if self.rtol >= 1e-8:
+            return {}
+        return dict(epsabs=0, epsrel=self.rtol)
+
+    def error(self, z):
+        """Estimated relative error of the distances at z
+
+        The estimate is the one the backend produced while integrating:
+        the quad error estimate for scalars, the measured error of a
+        table or Gauss-Legendre rule, and the solver tolerance for
+        'ode'.  It is kept in the integral_cache with the distances, so
+        after DC(z) or any other distance at the same z nothing is
+        integrated again.  Arrays integrated cumulatively have no
+        estimate of their own (nor have results whose estimate was
+        evicted from the cache); they are compared with a single quad
+        integral at their largest redshift.  The relative error of DC
+        carries over to DM, DA and DL; mu has an absolute error of
+        5 / ln(10) times this.
+
+        Parameters
+        ----------
+        z : float or array_like
+            redshift
+
+        Returns
+        -------
+        err : float or ndarray
+            estimated relative error, shaped like z
+
+        Examples
+        --------
+        >>> Cosmology(accuracy='fast').error(1.0) < 1e-4
+        True
+        """
+        y, err = self._integral(z, return_error=True)
+        if err is None:
+            # arrays integrated cumulatively: the rule at the largest
+            # redshift against a single quad integral
+            zflat = np.asarray(z, dtype=float).ravel()
+            yflat = np.asarray(y).ravel()
+            finite = np.isfinite(yflat)
+            err = 0.0
+            if finite.any():
+                i = np.flatnonzero(finite)[np.argmax(zflat[finite])]
+                exact, abserr = self._quad(self._Einv, 0, zflat[i],
+                                           return_error=True)
+                if exact != 0:
+                    err = (abs(yflat[i] - exact) + abserr) / abs(exact)
+        if is_scalar(z):
+            return float(err)
+        return np.full(np.shape(z), err)
+
+    @contextlib.contextmanager
+    def instrument(self):
+        """Instrumented copy of this instance for use in a with-block
+
+        The instance itself is not modified, so calls made through it,
+        from this or other threads, are neither recorded nor slowed down.
+        Tables and ODE solutions the copy builds are kept to itself
+        rather than shared with other instances.
+
+        Returns
+        -------
+        cosmo : Cosmology
+            an equal instance whose cosmo.stats (a CallStats) counts
+            _Einv evaluations, quad calls, subintervals,
+            IntegrationWarnings and per-method calls and wall time until
+            the block ends; stats.as_dict() gives a plain dictionary
+
+        Examples
+        --------
+        >>> with Cosmology().instrument() as cosmo:
+        ...     mu = cosmo.mu(1.5)
+        >>> cosmo.stats.calls['DC'], cosmo.stats.quad_calls
+        (1, 1)
+        """
+        stats = CallStats()
+        cosmo = instrumented_class(type(self), stats)(*self.__reduce__()[1])
+        # share the helpers already built
+        for name in ('_table', '_ode', '_quad_integrand'):
+            setattr(cosmo, name, getattr(self, name))
+        try:
+            yield cosmo
+        finally:
+            stats.active = False
 
     def _Einv(self, z):
         """Returns the inverse of Hogg equation 14 
         
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             E^(-1) where E is given by Hogg eqn 14
         """
-        return 1.0/np.sqrt(self.OmegaM*(1.0+z)**3.0 + self.OmegaK \
-                        *(1.0+z)**2.0 + self.OmegaL)
+        # nested products are much cheaper than float powers on arrays
+        zp1 = 1.0 + z
+        return 1.0/np.sqrt((self.OmegaM*zp1 + self.OmegaK)*zp1*zp1 \
+                           + self.OmegaL)
 
     def DC(self, z):
         """Comoving Distance (Mpc)
 
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             The comoving distance in Mpc, given by Hogg eqn 15
             
         Examples
@@ -70,21 +528,20 @@ class Cosmology(object):
         >>> cosmo.DC(1.0)
         3303.8288058874678
         """
-        # Compute the comoving distance in Mpc using scipy.integrate.quad
-        # following Eqn 15
-        return self.DH * integrate.quad(self._Einv,0,z)[0]
+        # Compute the comoving distance in Mpc following Eqn 15
+        return self.DH * self._integral(z)
 
     def DM(self, z):
         """Transverse Comoving Distance (Mpc)
 
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             The transverse comoving distance in Mpc, given by Hogg eqn 16
             
         Examples
@@ -93,27 +550,24 @@ class Cosmology(object):
         >>> cosmo.DM(1.0)
         3303.8288058874678
         """
-        # Compute the transverse comoving distance in Mpc (Eqn 16)
-        if self.OmegaK > 0.0:
-            return self.DH / np.sqrt(self.OmegaK) * \
-                    np.sinh(np.sqrt(self.OmegaK)*self.DC(z)/self.DH)
-        elif self.OmegaK == 0.0:
-            return self.DC(z)
-        elif self.OmegaK < 0.0:
-            return self.DH / np.sqrt(np.abs(self.OmegaK)) * \
-                    np.sin(np.sqrt(np.abs(self.OmegaK))*self.DC(z)/self.DH)
+        return self._DM_from_DC(self.DC(z))
+
+    def _DM_from_DC(self, DC):
+        # Compute the transverse comoving distance in Mpc (Eqn 16),
+        # for any sign of the curvature (see curvature.sinn)
+        return self.DH * sinn(DC / self.DH, self.OmegaK)
 
     def DA(self, z):
         """Angular Diameter Distance (Mpc)
         
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             The angular diameter distance in Mpc, given by Hogg eqn 18
             
         Examples
@@ -123,19 +577,161 @@ class Cosmology(object):
         1651.9144029437339
         """
         # Compute the Angular Diameter distance in Mpc (Eqn 18)
-        return self.DM(z) / (1.0+z)
+        if is_scalar(z):
+            return self.DM(z) / (1.0+z)
+        return self.DM(z) / (1.0+np.asarray(z))
+
+    def DA12(self, z1, z2):
+        """Angular Diameter Distance between two redshifts (Mpc)
+
+        The comoving distance is evaluated once per unique redshift of
+        z1 and z2, so the cost of lens-source pair arrays scales with
+        the number of distinct redshifts, not the number of pairs.
+
+        Parameters
+        ----------
+        z1 : float or array_like
+            redshift of the nearer object (the lens)
+        z2 : float or array_like
+            redshift of the farther object (the source), broadcast
+            against z1
+
+        Returns
+        -------
+        y : float or ndarray
+            The angular diameter distance of z2 seen from z1 in Mpc,
+            DH sinn((DC2 - DC1) / DH) / (1 + z2), which is Hogg eqn 19
+            for OmegaK >= 0 and also holds for a closed universe.
+            Negative where z2 < z1.
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> round(cosmo.DA12(0.5, 1.0), 6)
+        707.601705
+        """
+        DC1, DC2 = self._DC_pairs(z1, z2)
+        if is_scalar(z1) and is_scalar(z2):
+            return float(self._DM_from_DC(DC2 - DC1) / (1.0+z2))
+        return self._DM_from_DC(DC2 - DC1) / (1.0+np.asarray(z2))
+
+    def _DC_pairs(self, z1, z2):
+        """DC at z1 and z2 from one evaluation at their unique values"""
+        if is_scalar(z1) and is_scalar(z2):
+            return self.DC(z1), self.DC(z2)
+        z1 = np.asarray(z1, dtype=float)
+        z2 = np.asarray(z2, dtype=float)
+        zu, inverse = np.unique(np.concatenate((z1.ravel(), z2.ravel())),
+                                return_inverse=True)
+        DC = self.DC(zu)[inverse]
+        return (DC[:z1.size].reshape(z1.shape),
+                DC[z1.size:].reshape(z2.shape))
+
+    def sigma_crit(self, z_lens, z_source, indptr=None, indices=None,
+                   chunksize=2 ** 20, out=None):
+        """Critical Surface Density for Lensing (Msun / Mpc^2)
+
+        The comoving distance is evaluated once on the sorted unique lens
+        and source redshifts.  The inputs are then read and the pairs
+        combined in chunks of chunksize, each looking its redshifts up
+        with searchsorted, so the memory used beyond the inputs and the
+        output grows with chunksize and the number of unique redshifts,
+        not with the number of pairs.
+
+        Parameters
+        ----------
+        z_lens : float or array_like
+            lens redshifts
+        z_source : float or array_like
+            source redshifts.  Without indptr, broadcast against z_lens
+        indptr, indices : array_like, optional
+            sparse pair list in CSR form: lens i is paired with the
+            sources z_source[indices[indptr[i]:indptr[i + 1]]], as in a
+            scipy.sparse.csr_matrix of neighbors.  z_lens is then 1-d
+            and the result has one value per entry of indices.
+        chunksize : int, optional
+            number of pairs evaluated at a time. Default = 2 ** 20
+        out : ndarray, optional
+            array to store the result in, e.g. a numpy.memmap for more
+            pairs than fit in memory
+
+        Returns
+        -------
+        y : float or ndarray
+            c^2 DS / (4 pi G DL DLS) in physical Msun / Mpc^2, with the
+            angular diameter distances DS and DL of the source and lens
+            (Hogg eqn 18) and DLS between them (see DA12); inf where
+            the source is not behind the lens
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> round(cosmo.sigma_crit(0.5, 1.0) / 1e15, 6)
+        3.083291
+        """
+        if indptr is None and is_scalar(z_lens) and is_scalar(z_source):
+            out = self.sigma_crit([z_lens], [z_source], out=out)
+            return float(out[0])
+        z_lens = np.asarray(z_lens, dtype=float)
+        z_source = np.asarray(z_source, dtype=float)
+
+        # distances at the sorted unique redshifts; the pairs index them
+        z = _unique_values((z_lens, z_source), chunksize)
+        DC = self.DC(z)
+        DM = self._DM_from_DC(DC)
+        # Sigma_crit = SIGMA_CRIT_SCALE (1 + z_lens) DM_source
+        #              / (DM_lens DH sinn((DC_source - DC_lens) / DH))
+        with np.errstate(divide='ignore'):
+            lens = SIGMA_CRIT_SCALE * (1.0 + z) / DM
+
+        if indptr is None:
+            shape = np.broadcast(z_lens, z_source).shape
+            lens_z = np.broadcast_to(z_lens, shape).flat
+            source_z = np.broadcast_to(z_source, shape).flat
+
+            def take(start, stop):
+                return (np.searchsorted(z, lens_z[start:stop]),
+                        np.searchsorted(z, source_z[start:stop]))
+        else:
+            indptr = np.asarray(indptr)
+            indices = np.asarray(indices)
+            shape = indices.shape
+            # the catalogs are looked up once, the pairs index them
+            lens_i = np.searchsorted(z, z_lens)
+            source_i = np.searchsorted(z, z_source)
+
+            def take(start, stop):
+                # the lens of each pair is the row holding it
+                row = np.searchsorted(indptr, np.arange(start, stop),
+                                      side='right') - 1
+                return lens_i[row], source_i[indices[start:stop]]
+
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape or not out.flags.c_contiguous:
+            raise ValueError("out must be a C-contiguous array of shape %s"
+                             % (shape,))
+        flat = out.reshape(-1)
+        for start in range(0, flat.size, chunksize):
+            stop = min(start + chunksize, flat.size)
+            # positions of the lens and source redshifts in z
+            i, j = take(start, stop)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = lens[i] * DM[j] / self._DM_from_DC(DC[j] - DC[i])
+            flat[start:stop] = np.where(DC[j] > DC[i], y, np.inf)
+        return out
 
     def DL(self, z):
         """Luminosity Distance (Mpc)
         
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             The luminosity distance in Mpc, given by Hogg eqn 21
             
         Examples
@@ -145,26 +741,283 @@ class Cosmology(object):
         6607.6576117749355
         """
         # Compute the Luminosity Distance in Mpc (Eqn 21)
-        return (1.0+z)*self.DM(z)
+        if is_scalar(z):
+            return (1.0+z)*self.DM(z)
+        return (1.0+np.asarray(z))*self.DM(z)
 
     def mu(self, z):
         """Distance Modulus (magnitudes)
 
         Parameters
         ----------
-        z : float
+        z : float or array_like
             redshift
         
         Returns
         -------
-        y : float
+        y : float or ndarray
             The distance modulus, given by Hogg eqn 25
             
         Examples
         --------
         >>> cosmo = Cosmology()
         >>> cosmo.mu(1.0)
-        44.100237655543722
+        44.10023765554372
         """
         # Compute the distance modulus (Eqn 25)
-        return 5.0*np.log10(self.DL(z)*(1.e6)/10.0)
\ No newline at end of file
+        mu = 5.0*np.log10(self.DL(z)*(1.e6)/10.0)
+        return float(mu) if is_scalar(z) else mu
+
+    def distances(self, z, which=('DC', 'DM', 'DA', 'DL', 'mu')):
+        """Several distance measures from a single integration
+
+        The comoving distance integral is evaluated once, and every
+        requested measure is derived from it (Hogg eqns 16, 18, 21, 25).
+
+        Parameters
+        ----------
+        z : float or array_like
+            redshift
+        which : string or sequence of strings, optional
+            measures to compute, from 'DC', 'DM', 'DA', 'DL', 'mu'.
+            Default is all of them.
+
+        Returns
+        -------
+        d : dict
+            maps each name in which to a float or ndarray shaped like z
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> d = cosmo.distances([0.5, 1.0], which=('DA', 'mu'))
+        >>> d['mu']
+        array([42.26118542, 44.10023766])
+        """
+        if isinstance(which, str):
+            which = (which,)
+        for name in which:
+            if name not in ('DC', 'DM', 'DA', 'DL', 'mu'):
+                raise ValueError("unknown distance measure %r" % name)
+        zp1 = 1.0 + np.asarray(z)
+        d = {}
+        d['DC'] = self.DC(z)
+        d['DM'] = self._DM_from_DC(d['DC'])
+        if 'DA' in which:
+            d['DA'] = d['DM'] / zp1
+        if 'DL' in which or 'mu' in which:
+            d['DL'] = zp1 * d['DM']
+        if 'mu' in which:
+            d['mu'] = 5.0*np.log10(d['DL']*(1.e6)/10.0)
+        if is_scalar(z):
+            return dict((name, float(d[name])) for name in which)
+        return dict((name, d[name]) for name in which)
+
+    def map(self, method, z, n_jobs=None, chunksize=2 ** 18):
+        """Evaluate a distance method over a large array in parallel
+
+        The redshifts are split into chunks that are evaluated by a
+        multiprocessing pool.  The instance is shipped to the workers by
+        its parameters only (see __reduce__), and each worker reuses its
+        own integral_cache across chunks.  With the 'table' backend the
+        table is built once and shared with the workers through shared
+        memory (see share_table) for the duration of the call.
+
+        Parameters
+        ----------
+        method : string
+            one of 'DC', 'DM', 'DA', 'DL', 'mu', 'tL', 'VC'
+        z : array_like
+            redshifts
+        n_jobs : int, optional
+            number of worker processes. Default is the number of CPUs.
+        chunksize : int, optional
+            number of redshifts per task. Default = 2 ** 18
+
+        Returns
+        -------
+        y : ndarray
+            method(z), in the input order and shape
+
+        Examples
+        --------
+        >>> cosmo = Cosmology(backend='table')
+        >>> cosmo.map('mu', [0.5, 1.0], n_jobs=2, chunksize=1)
+        array([42.26118542, 44.10023766])
+        """
+        if method not in MEASURES:
+            raise ValueError("method must be one of %s" % (MEASURES,))
+        import multiprocessing
+        z = np.asarray(z, dtype=float)
+        flat = z.ravel()
+        if n_jobs is None:
+            n_jobs = multiprocessing.cpu_count()
+        if n_jobs <= 1 or len(flat) <= chunksize:
+            return getattr(self, method)(z)
+
+        tasks = [(self, method, flat[i:i + chunksize])
+                 for i in range(0, len(flat), chunksize)]
+        with contextlib.ExitStack() as stack:
+            initializer = initargs = None
+            if self.backend == 'table':
+                shared = stack.enter_context(self.share_table())
+                initializer, initargs = self.attach_table, (shared,)
+            pool = multiprocessing.Pool(min(n_jobs, len(tasks)),
+                                        initializer, initargs or ())
+            try:
+                results = pool.map(_map_chunk, tasks, chunksize=1)
+            finally:
+                pool.terminate()
+                pool.join()
+        return np.concatenate(results).reshape(z.shape)
+
+    def _measure_and_slope(self, quantity, z):
+        """Distance measure and its derivative d(quantity)/dz at z
+
+        Both are derived from a single evaluation of DC, using
+        dDC/dz = DH / E(z) (Hogg eqn 15) and the chain rule through
+        eqns 16, 18, 21 and 25.
+        """
+        DC = self.DC(z)
+        DM = self._DM_from_DC(DC)
+        dDC = self.DH * self._Einv(z)
+        dDM = dDC * cosn(DC / self.DH, self.OmegaK)
+
+        if quantity == 'DC':
+            return DC, dDC
+        elif quantity == 'DM':
+            return DM, dDM
+        elif quantity == 'DA':
+            return DM / (1.0 + z), dDM / (1.0 + z) - DM / (1.0 + z) ** 2
+        DL, dDL = (1.0 + z) * DM, DM + (1.0 + z) * dDM
+        if quantity == 'DL':
+            return DL, dDL
+        return 5.0 * np.log10(DL * 1.e5), 5.0 / np.log(10) * dDL / DL
+
+    def z_at(self, quantity, values, zmax=1.e4, tol=1.e-12, maxiter=20):
+        """Redshift at which a distance measure takes the given values
+
+        Inverts DC, DM, DA, DL or mu for whole arrays at once: a starting
+        guess is interpolated from the measure on a monotonic redshift
+        grid, then polished with vectorized Newton iterations using the
+        analytic derivative dDC/dz = DH / E(z).
+
+        Parameters
+        ----------
+        quantity : string
+            one of 'DC', 'DM', 'DA', 'DL', 'mu'
+        values : float or array_like
+            values of the measure (Mpc, or magnitudes for mu)
+        zmax : float, optional
+            largest redshift searched. Default = 1e4
+        tol : float, optional
+            convergence tolerance on z / (1 + z). Default = 1e-12
+        maxiter : int, optional
+            maximum number of Newton iterations. Default = 20
+
+        Returns
+        -------
+        z : float or ndarray
+            redshift, with the shape of values.  Values outside the range
+            of the measure on [0, zmax] give NaN.  Measures that are not
+            monotonic (DA, and DM, DL and mu in closed models) are only
+            inverted below the redshift of their first maximum.
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> round(cosmo.z_at('mu', 44.100237655543722), 10)
+        1.0
+        """
+        if quantity not in ('DC', 'DM', 'DA', 'DL', 'mu'):
+            raise ValueError("quantity must be one of DC, DM, DA, DL, mu")
+        values = np.asarray(values, dtype=float)
+
+        # grid of the measure, uniform in ln(1+z), cut at its first
+        # maximum (or NaN) so that it is monotonic
+        zgrid = np.expm1(np.linspace(0, np.log1p(zmax), 4097))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            qgrid = self._measure_and_slope(quantity, zgrid)[0]
+            rising = np.diff(qgrid) > 0
+        if not rising.all():
+            imax = np.argmin(rising) + 1
+            zgrid, qgrid = zgrid[:imax], qgrid[:imax]
+        zmax = zgrid[-1]
+        valid = (values >= qgrid[0]) & (values <= qgrid[-1])
+        z = np.array(np.interp(values, qgrid, zgrid))
+
+        # Newton polishing, restricted to the points still moving
+        active = np.flatnonzero(valid)
+        target = values[valid]
+        zactive = z[valid]
+        for i in range(maxiter):
+            if len(active) == 0:
+                break
+            q, dq = self._measure_and_slope(quantity, zactive)
+            step = (q - target) / dq
+            # steps that would cross z = 0 are halved towards it instead
+            znew = zactive - step
+            zactive = np.where(znew < 0, 0.5 * zactive,
+                               np.minimum(znew, zmax))
+            done = abs(step) <= tol * (1 + zactive)
+            z.flat[active[done]] = zactive[done]
+            active, target, zactive = (active[~done], target[~done],
+                                       zactive[~done])
+        z.flat[active] = zactive
+
+        z[~valid] = np.nan
+        if z.ndim == 0:
+            return float(z)
+        return z
+
+    def tL(self, z):
+        """Lookback Time (Gyr)
+
+        Parameters
+        ----------
+        z : float or array_like
+            redshift
+
+        Returns
+        -------
+        y : float or ndarray
+            The lookback time in Gyr, given by Hogg eqn 30
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> round(cosmo.tL(1.0), 4)
+        7.7153
+        """
+        # the 'ode' backend co-integrates tL with DC
+        if self.backend == 'ode':
+            return self.tH * self.ode.lookback_time(z)
+        integrand = lambda z: self._Einv(z) / (1.0 + z)
+        if is_scalar(z):
+            return self.tH * self._quad(integrand, 0, z)
+        return self.tH * cumulative_integral(integrand, z)
+
+    def VC(self, z):
+        """All-sky Comoving Volume (Mpc^3)
+
+        Parameters
+        ----------
+        z : float or array_like
+            redshift
+
+        Returns
+        -------
+        y : float or ndarray
+            The comoving volume out to z in Mpc^3, given by Hogg eqn 29
+
+        Examples
+        --------
+        >>> cosmo = Cosmology()
+        >>> round(cosmo.VC(1.0) / 1e9, 4)
+        151.0571
+        """
+        # the 'ode' backend co-integrates VC with DC
+        if self.backend == 'ode':
+            return self.DH ** 3 * self.ode.comoving_volume(z)
+        x = self.DM(z) / self.DH
+        return self.DH ** 3 * comoving_volume(x, self.OmegaK)
@@ -0,0 +1,140 @@
+"""Curvature-dependent distance functions without branches on OmegaK
+
+With x = DC / DH and u = OmegaK x^2 the transverse comoving distance
+(Hogg eqn 16) and the comoving volume (Hogg eqn 29) are
+
+    DM / DH   = sinh(sqrt(OmegaK) x) / sqrt(OmegaK)  = x sum_k u^k / (2k+1)!
+    VC / DH^3 = 2 pi / OmegaK [x' sqrt(1 + OmegaK x'^2)
+                               - arcsinh(sqrt(OmegaK) x') / sqrt(OmegaK)]
+
+(x' = DM / DH), with sinh and arcsinh becoming sin and arcsin of
+sqrt(|OmegaK|) for OmegaK < 0.  The power series in u are the same for
+either sign, so near flatness (|u| < SERIES_MAX) they are used for all
+curvatures at once; this is also where the closed form of the volume
+loses digits to cancellation.  Elsewhere the sign is selected per element
+with np.where, so x and OmegaK may be arrays that broadcast together.
+"""
+import math
+
+import numpy as np
+
+# |OmegaK x^2| below which the power series are used, and the number of
+# terms that reaches double precision there
+SERIES_MAX = 0.01
+NTERMS = 9
+
+
+def _volume_coefficient(k):
+    # coefficient of u^k in [x sqrt(1+u) - arcsinh(sqrt(u))] / (x u), from
+    # the binomial series of sqrt(1+u) and the Taylor series of arcsinh
+    j = k + 1
+    binomial = 1.0
+    for i in range(j):
+        binomial *= (0.5 - i) / (i + 1)
+    arcsinh = ((-1) ** j * math.factorial(2 * j)
+               / (4 ** j * math.factorial(j) ** 2 * (2 * j + 1)))
+    return 2 * np.pi * (binomial - arcsinh)
+
+
+# polynomial coefficients in u, highest power first (for np.polyval)
+SINN_SERIES = [1. / math.factorial(2 * k + 1) for k in range(NTERMS)][::-1]
+COSN_SERIES = [1. / math.factorial(2 * k) for k in range(NTERMS)][::-1]
+VOLUME_SERIES = [_volume_coefficient(k) for k in range(NTERMS)][::-1]
+
+
+def _series_or_closed(x, OmegaK, power, series, closed):
+    """x^power P(u) where |u| < SERIES_MAX, closed(x, OmegaK) elsewhere"""
+    x, OmegaK = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                    np.asarray(OmegaK, dtype=float))
+    u = OmegaK * x * x
+    near = abs(u) < SERIES_MAX
+    if np.all(near):
+        y = np.asarray(x ** power * np.polyval(series, u))
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            y = np.asarray(closed(x, OmegaK), dtype=float)
+        if np.any(near):
+            y[near] = x[near] ** power * np.polyval(series, u[near])
+    if y.ndim == 0:
+        return float(y)
+    return y
+
+
+def _sinn(x, OmegaK):
+    s = np.sqrt(abs(OmegaK))
+    return np.where(OmegaK > 0, np.sinh(s * x), np.sin(s * x)) / s
+
+
+def _cosn(x, OmegaK):
+    s = np.sqrt(abs(OmegaK))
+    return np.where(OmegaK > 0, np.cosh(s * x), np.cos(s * x))
+
+
+def _volume(x, OmegaK):
+    s = np.sqrt(abs(OmegaK))
+    angle = np.where(OmegaK > 0, np.arcsinh(s * x), np.arcsin(s * x)) / s
+    return 2 * np.pi / OmegaK * (x * np.sqrt(1 + OmegaK * x * x) - angle)
+
+
+def sinn(x, OmegaK):
+    """Transverse comoving distance DM / DH from DC / DH (Hogg eqn 16)
+
+    Parameters
+    ----------
+    x : float or array_like
+        line-of-sight comoving distance DC / DH
+    OmegaK : float or array_like
+        curvature density parameter, broadcast against x
+
+    Returns
+    -------
+    y : float or ndarray
+        DM / DH
+
+    Examples
+    --------
+    >>> sinn(1.0, 0.0)
+    1.0
+    >>> sinn(1.0, [-1e-12, 1e-12])
+    array([1., 1.])
+    """
+    if np.ndim(OmegaK) == 0 and OmegaK == 0:
+        # flat: exactly the identity
+        return x if np.ndim(x) == 0 else np.asarray(x, dtype=float)
+    return _series_or_closed(x, OmegaK, 1, SINN_SERIES, _sinn)
+
+
+def cosn(x, OmegaK):
+    """Derivative d(DM / DH) / d(DC / DH) of sinn
+
+    Parameters
+    ----------
+    x : float or array_like
+        line-of-sight comoving distance DC / DH
+    OmegaK : float or array_like
+        curvature density parameter, broadcast against x
+
+    Returns
+    -------
+    y : float or ndarray
+        cosh(sqrt(OmegaK) x), or cos(sqrt(-OmegaK) x) for OmegaK < 0
+    """
+    return _series_or_closed(x, OmegaK, 0, COSN_SERIES, _cosn)
+
+
+def comoving_volume(x, OmegaK):
+    """All-sky comoving volume VC / DH^3 from DM / DH (Hogg eqn 29)
+
+    Parameters
+    ----------
+    x : float or array_like
+        transverse comoving distance DM / DH
+    OmegaK : float or array_like
+        curvature density parameter, broadcast against x
+
+    Returns
+    -------
+    y : float or ndarray
+        VC / DH^3, which is 4 pi x^3 / 3 for OmegaK = 0
+    """
+    return _series_or_closed(x, OmegaK, 3, VOLUME_SERIES, _volume)
@@ -0,0 +1,113 @@
+"""Opt-in instrumentation of Cosmology calls
+
+Cosmology.instrument() yields a copy of an instance as a subclass whose
+methods record integrand evaluations, quad calls, subintervals,
+integration warnings and the wall time of each public method.  The
+original instance keeps running the plain class, so there is no
+overhead when instrumentation is off and nothing is recorded from other
+users of that instance.
+"""
+import functools
+import time
+import warnings
+
+import numpy as np
+
+# public methods whose calls and wall time are recorded
+TIMED_METHODS = ('DC', 'DM', 'DA', 'DL', 'mu', 'tL', 'VC', 'distances',
+                 'z_at', 'map')
+
+
+class CallStats(object):
+    """Counters collected by Cosmology.instrument()
+
+    Attributes
+    ----------
+    einv_calls : int
+        Python-level calls of _Einv (each may evaluate an array)
+    einv_points : int
+        redshifts at which 1/E(z) was evaluated, including evaluations
+        inside compiled quad integrands
+    quad_calls : int
+        calls of scipy.integrate.quad
+    quad_subintervals : int
+        subintervals used by those quad calls
+    integration_warnings : int
+        IntegrationWarnings raised by quad
+    calls, seconds : dict
+        number of calls and inclusive wall time of each public method
+    """
+    def __init__(self):
+        self.active = True
+        self.einv_calls = 0
+        self.einv_points = 0
+        self.quad_calls = 0
+        self.quad_subintervals = 0
+        self.integration_warnings = 0
+        self.calls = dict((name, 0) for name in TIMED_METHODS)
+        self.seconds = dict((name, 0.0) for name in TIMED_METHODS)
+
+    def as_dict(self):
+        """The counters as a plain (JSON serializable) dictionary"""
+        return dict(einv_calls=self.einv_calls,
+                    einv_points=self.einv_points,
+                    quad_calls=self.quad_calls,
+                    quad_subintervals=self.quad_subintervals,
+                    integration_warnings=self.integration_warnings,
+                    calls=dict(self.calls), seconds=dict(self.seconds))
+
+    def __repr__(self):
+        return 'CallStats(%r)' % self.as_dict()
+
+
+def instrumented_class(cls, stats):
+    """Subclass of cls whose methods record into stats
+
+    stats is also available as the class attribute stats.  Recording
+    stops once stats.active is False, so integrands captured by tables
+    built inside the context cost nothing afterwards.  Instances of the
+    subclass do not publish the tables and ODE solutions they build
+    (_share_helpers), since those call the recording _Einv.
+    """
+    def timed(name):
+        method = getattr(cls, name)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            t0 = time.time()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                if stats.active:
+                    stats.calls[name] += 1
+                    stats.seconds[name] += time.time() - t0
+        return wrapper
+
+    def _Einv(self, z):
+        if stats.active:
+            stats.einv_calls += 1
+            stats.einv_points += np.size(z)
+        return cls._Einv(self, z)
+
+    def _quad(self, func, a, b, return_error=False):
+        from scipy import integrate
+        result = integrate.quad(func, a, b, full_output=1,
+                                **self._quad_tolerance())
+        if stats.active:
+            stats.quad_calls += 1
+            stats.quad_subintervals += result[2]['last']
+            stats.einv_points += result[2]['neval']
+        # with full_output quad returns its warning message instead of
+        # issuing it, so count it and pass it on
+        if len(result) > 3:
+            if stats.active:
+                stats.integration_warnings += 1
+            warnings.warn(result[3], integrate.IntegrationWarning)
+        return result[:2] if return_error else result[0]
+
+    namespace = dict((name, timed(name)) for name in TIMED_METHODS)
+    namespace.update(_Einv=_Einv, _quad=_quad, stats=stats,
+                     _share_helpers=False, __module__=cls.__module__)
+    if hasattr(cls, '__slots__'):
+        namespace['__slots__'] = ()
+    return type(cls.__name__, (cls,), namespace)
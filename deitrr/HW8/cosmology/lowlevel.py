@@ -0,0 +1,123 @@
+"""Compiled integrand for scipy.integrate.quad
+
+quad calls its integrand 21 times per subinterval; a bound Python method
+spends most of that time in interpreter overhead.  By default quad is
+given a plain-float Python closure.  Calling build_library() compiles the
+C integrand in _einv.c with the system C compiler (CC, default ``cc``)
+into the user cache directory and loads it; from then on the integrand
+is handed to quad as a scipy.LowLevelCallable, with the density
+parameters passed through user_data.  Nothing is compiled or loaded
+unless build_library() (also available as cosmology.build_library) is
+called.
+"""
+import math
+import os
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_einv.c')
+
+# the compiled library; None if not built, False if unavailable
+_library = None
+
+
+def cache_dir():
+    """Directory for files generated by the cosmology package"""
+    return os.environ.get('COSMOLOGY_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache',
+                                       'cosmology'))
+
+
+def _build():
+    import ctypes
+    import hashlib
+    import subprocess
+    import sysconfig
+    import tempfile
+    with open(SOURCE, 'rb') as f:
+        tag = hashlib.sha1(f.read()).hexdigest()[:12]
+    suffix = sysconfig.get_config_var('SHLIB_SUFFIX') or '.so'
+    path = os.path.join(cache_dir(), '_einv-%s%s' % (tag, suffix))
+
+    if not os.path.exists(path):
+        try:
+            os.makedirs(cache_dir())
+        except OSError:
+            if not os.path.isdir(cache_dir()):
+                raise
+        # compile to a temporary name and rename, so that concurrent
+        # processes never load a partially written library
+        fd, tmp = tempfile.mkstemp(suffix=suffix, dir=cache_dir())
+        os.close(fd)
+        try:
+            with open(os.devnull, 'w') as devnull:
+                subprocess.check_call([os.environ.get('CC', 'cc'), '-O2',
+                                       '-shared', '-fPIC', '-o', tmp,
+                                       SOURCE, '-lm'],
+                                      stdout=devnull, stderr=devnull)
+            os.rename(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    lib = ctypes.CDLL(path)
+    lib.einv.restype = ctypes.c_double
+    lib.einv.argtypes = (ctypes.c_int, ctypes.POINTER(ctypes.c_double),
+                         ctypes.c_void_p)
+    return lib
+
+
+def build_library():
+    """Compile (if needed) and load the C integrand for this process
+
+    The library is built once per version of _einv.c in the cache
+    directory (COSMOLOGY_CACHE_DIR, or ~/.cache/cosmology).  A Cosmology
+    instance picks its quad integrand at its first scalar integral, so
+    call this before using the instances that should be compiled; an
+    instance that already integrated a scalar keeps the Python closure.
+
+    Examples
+    --------
+    >>> import cosmology
+    >>> lib = cosmology.build_library()  # doctest: +SKIP
+    >>> DC = cosmology.Cosmology().DC(1.0)  # doctest: +SKIP
+
+    Returns
+    -------
+    lib : ctypes.CDLL or None
+        the compiled library, or None if it could not be built
+    """
+    import subprocess
+    global _library
+    if _library is None:
+        try:
+            _library = _build()
+        except (OSError, subprocess.CalledProcessError):
+            _library = False
+    return _library or None
+
+
+def quad_integrand(OmegaM, OmegaK, OmegaL):
+    """Scalar integrand 1/E(z) for integrate.quad
+
+    Parameters
+    ----------
+    OmegaM, OmegaK, OmegaL : float
+        density parameters
+
+    Returns
+    -------
+    func : scipy.LowLevelCallable or callable
+        the compiled integrand if build_library() succeeded, otherwise
+        a Python closure
+    """
+    if _library:
+        import ctypes
+        from scipy import LowLevelCallable
+        omega = (ctypes.c_double * 3)(OmegaM, OmegaK, OmegaL)
+        # the cast pointer keeps a reference to omega alive
+        return LowLevelCallable(_library.einv,
+                                ctypes.cast(omega, ctypes.c_void_p))
+
+    def Einv(z, sqrt=math.sqrt):
+        zp1 = 1.0 + z
+        return 1.0 / sqrt((OmegaM * zp1 + OmegaK) * zp1 * zp1 + OmegaL)
+    return Einv
@@ -0,0 +1,127 @@
+"""Dense-output ODE solution for the distance measures
+
+The comoving distance, lookback time and comoving volume all follow
+from first order ODEs in redshift (Hogg eqns 15, 28 and 30):
+
+    d(DC/DH)/dz     = 1 / E(z)
+    d(tL/tH)/dz     = 1 / ((1+z) E(z))
+    d(VC/DH^3)/dz   = 4 pi (DM/DH)^2 / E(z)
+
+which are integrated together in a single pass.
+"""
+import numpy as np
+
+from .curvature import sinn
+
+
+class DistanceODE(object):
+    """Continuous solution of the distance ODEs over [0, zmax]
+
+    Parameters
+    ----------
+    Einv : callable
+        1 / E(z), Hogg eqn 14
+    OmegaK : float
+        curvature density parameter, used for DM / DH
+    zmax : float, optional
+        initial upper redshift of the solution. Default = 10.  Requests
+        beyond zmax re-solve the system over a larger range, and
+        negative redshifts are served by a second solution integrated
+        down from 0.
+    rtol : float, optional
+        relative tolerance of the integrator. Default = 1e-8
+
+    Attributes
+    ----------
+    solution : scipy.integrate.OdeSolution
+        dense-output interpolant of [DC/DH, tL/tH, VC/DH^3]
+    nbytes : int
+        memory footprint of the interpolant arrays, in bytes
+
+    Examples
+    --------
+    >>> from cosmology import Cosmology
+    >>> cosmo = Cosmology(backend='ode')
+    >>> cosmo.DC(1.0)
+    3303.828805...
+    """
+    def __init__(self, Einv, OmegaK, zmax=10.0, rtol=1e-8):
+        self.Einv = Einv
+        self.OmegaK = OmegaK
+        self.rtol = rtol
+        self._below = None
+        self.zmin = 0.0
+        self._solve(zmax)
+
+    def _derivatives(self, z, y):
+        Einv = self.Einv(z)
+        return [Einv, Einv / (1.0 + z),
+                4 * np.pi * sinn(y[0], self.OmegaK) ** 2 * Einv]
+
+    def _integrate(self, zend):
+        # scipy is imported on first use to keep startup fast
+        from scipy import integrate
+        result = integrate.solve_ivp(self._derivatives, (0.0, zend),
+                                     [0.0, 0.0, 0.0], method='DOP853',
+                                     dense_output=True, rtol=self.rtol,
+                                     atol=1e-14)
+        if not result.success:
+            raise RuntimeError("distance ODE failed: %s" % result.message)
+        return result.sol
+
+    def _solve(self, zmax):
+        # replace the solution before advertising the larger range
+        self.solution = self._integrate(zmax)
+        self.zmax = float(zmax)
+
+    def _solve_below(self, zmin):
+        # negative redshifts (blueshifts) are integrated backwards from 0
+        self._below = self._integrate(zmin)
+        self.zmin = float(zmin)
+
+    @property
+    def nbytes(self):
+        arrays = [value for interpolant in self.solution.interpolants
+                  for value in vars(interpolant).values()
+                  if isinstance(value, np.ndarray)]
+        nbytes = self.solution.ts.nbytes + sum(a.nbytes for a in arrays)
+        if self._below is not None:
+            nbytes += self._below.ts.nbytes + sum(
+                value.nbytes for interpolant in self._below.interpolants
+                for value in vars(interpolant).values()
+                if isinstance(value, np.ndarray))
+        return nbytes
+
+    def _evaluate(self, i, z):
+        zarr = np.asarray(z, dtype=float)
+        finite = np.isfinite(zarr)
+        zmax = np.max(zarr, initial=0.0, where=finite)
+        zmin = np.min(zarr, initial=0.0, where=finite)
+        if zmax > self.zmax:
+            self._solve(max(zmax, 2 * self.zmax))
+        if zmin < self.zmin:
+            self._solve_below(zmin)
+        flat = zarr.ravel()
+        y = np.empty(flat.shape)
+        below = flat < 0
+        # OdeSolution cannot evaluate empty arrays
+        if not below.all():
+            y[~below] = self.solution(flat[~below])[i]
+        if below.any():
+            y[below] = self._below(flat[below])[i]
+        y = y.reshape(zarr.shape)
+        if y.ndim == 0:
+            return float(y)
+        return y
+
+    def __call__(self, z):
+        """Dimensionless comoving distance DC / DH"""
+        return self._evaluate(0, z)
+
+    def lookback_time(self, z):
+        """Dimensionless lookback time tL / tH"""
+        return self._evaluate(1, z)
+
+    def comoving_volume(self, z):
+        """Dimensionless all-sky comoving volume VC / DH^3"""
+        return self._evaluate(2, z)
@@ -0,0 +1,202 @@
+"""Asyncio distance service with request micro-batching
+
+Clients send newline-delimited JSON requests over a local TCP or Unix
+socket, one per line,
+
+    {"z": [0.1, 0.5, 1.0], "q": "DL"}
+    {"z": 0.3, "q": ["DA", "mu"]}
+
+and receive one JSON line per request in order, mapping each measure to
+its values (or {"error": message}).  Requests arriving within max_delay
+seconds of each other, up to max_batch redshifts, are evaluated together
+with a single Cosmology.distances call, so the per-call overhead is
+shared by every client in the batch:
+
+    python -m cosmology.server --port 8765 --max-delay 0.002
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import numpy as np
+
+from .catalog import MEASURES
+from .cosmology import Cosmology
+
+
+class DistanceServer(object):
+    """Coalesce concurrent distance requests into vectorized batches
+
+    Parameters
+    ----------
+    cosmo : Cosmology, optional
+        cosmology to evaluate. Default is Cosmology(backend='table')
+    max_batch : int, optional
+        evaluate as soon as this many redshifts are waiting.
+        Default = 65536
+    max_delay : float, optional
+        longest time in seconds a request waits for others to join its
+        batch. Default = 0.001
+
+    Attributes
+    ----------
+    requests, batches, redshifts : int
+        requests answered, batches evaluated and redshifts evaluated
+
+    Examples
+    --------
+    >>> server = DistanceServer()
+    >>> asyncio.run(server.evaluate([0.5, 1.0], 'DL'))
+    {'DL': array([2832.938..., 6607.657...])}
+    """
+    def __init__(self, cosmo=None, max_batch=2 ** 16, max_delay=1e-3):
+        if cosmo is None:
+            cosmo = Cosmology(backend='table')
+        self.cosmo = cosmo
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.requests = 0
+        self.batches = 0
+        self.redshifts = 0
+        self._pending = []
+        self._size = 0
+        self._timer = None
+
+    async def evaluate(self, z, which='DL'):
+        """Distance measures at z, computed in the next batch
+
+        Parameters
+        ----------
+        z : float or array_like
+            redshift
+        which : string or sequence of strings, optional
+            measures to compute, from 'DC', 'DM', 'DA', 'DL', 'mu'.
+            Default = 'DL'
+
+        Returns
+        -------
+        d : dict
+            maps each measure to an ndarray shaped like z
+        """
+        if isinstance(which, str):
+            which = (which,)
+        for name in which:
+            if name not in MEASURES:
+                raise ValueError("unknown distance measure %r" % name)
+        z = np.asarray(z, dtype=float)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((z, tuple(which), future))
+        self._size += z.size
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        """Evaluate every pending request in one call"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._size = self._pending, [], 0
+        if not pending:
+            return
+        which = sorted(set(name for z, names, future in pending
+                           for name in names))
+        z = np.concatenate([zi.ravel() for zi, names, future in pending])
+        try:
+            # mu of z = 0 in another client's request is not an error
+            with np.errstate(divide='ignore'):
+                d = self.cosmo.distances(z, which=which)
+        except Exception as e:
+            for zi, names, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(pending)
+        self.redshifts += len(z)
+
+        start = 0
+        for zi, names, future in pending:
+            stop = start + zi.size
+            if not future.done():
+                future.set_result(dict((name, d[name][start:stop]
+                                        .reshape(zi.shape))
+                                       for name in names))
+            start = stop
+
+    async def handle(self, reader, writer):
+        """Answer the JSON requests of one connection, in order"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    d = await self.evaluate(request['z'],
+                                            request.get('q', 'DL'))
+                    response = dict((name, value.tolist())
+                                    for name, value in d.items())
+                except Exception as e:
+                    response = dict(error='%s: %s' % (type(e).__name__, e))
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Start listening, on a Unix socket if path is given
+
+        Returns the asyncio.Server; with port=0 the port chosen by the
+        system is server.sockets[0].getsockname()[1].
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(server, host='127.0.0.1', port=8765, path=None):
+    """Run server until cancelled"""
+    listener = await server.start(host, port, path)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cosmology.server',
+        description=__doc__.split('\n')[0])
+    parser.add_argument('--OmegaM', type=float, default=0.3,
+                        help="matter density parameter (default 0.3)")
+    parser.add_argument('--OmegaK', type=float, default=0.0,
+                        help="curvature density parameter (default 0)")
+    parser.add_argument('--h', type=float, default=0.7,
+                        help="dimensionless Hubble constant (default 0.7)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH',
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=2 ** 16,
+                        help="redshifts per batch (default 65536)")
+    parser.add_argument('--max-delay', type=float, default=1e-3,
+                        help="batching window in seconds (default 0.001)")
+    args = parser.parse_args(argv)
+
+    cosmo = Cosmology(OmegaM=args.OmegaM, h=args.h, backend='table',
+                      OmegaK=args.OmegaK)
+    server = DistanceServer(cosmo, args.max_batch, args.max_delay)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Distance tables published in shared memory
+
+A SharedTable copies the grid of a DistanceTable into a
+multiprocessing.shared_memory segment once.  Pickling it (for instance
+as a Pool initializer argument) sends only the segment name and the
+table parameters; unpickling attaches to the segment, so every worker
+process reads the same physical pages instead of building and storing
+its own table.
+
+The publishing process owns the segment and unlinks it on close(), on
+leaving a with block, when the SharedTable is garbage collected or at
+interpreter exit, whichever comes first.  Attached copies only unmap it.
+"""
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .table import DistanceTable
+
+
+def _release(segment, unlink):
+    try:
+        segment.close()
+    except BufferError:
+        # arrays still view the segment; it is unmapped when they go
+        pass
+    if unlink:
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedTable(object):
+    """The grid of a DistanceTable in a named shared memory segment
+
+    Parameters
+    ----------
+    key : tuple
+        integral_cache key of the table, identifying its parameters
+    table : DistanceTable
+        table to publish
+
+    Attributes
+    ----------
+    name : string
+        name of the shared memory segment
+    key : tuple
+        the table's integral_cache key
+    owner : bool
+        True in the publishing process, which unlinks the segment
+
+    Examples
+    --------
+    >>> import multiprocessing
+    >>> from cosmology import Cosmology
+    >>> cosmo = Cosmology(backend='table')
+    >>> with cosmo.share_table() as shared:
+    ...     with multiprocessing.Pool(4, cosmo.attach_table, (shared,)) as pool:
+    ...         mu = pool.map(cosmo.mu, [0.5, 1.0])
+    """
+    def __init__(self, key, table):
+        nbytes = 2 * (table.n + 1) * 8
+        segment = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._setup(segment, key, table.zmax, table.rtol, table.n,
+                    table.error, owner=True)
+        self._grid[0] = table.y
+        self._grid[1] = table.dy
+
+    @classmethod
+    def attach(cls, name, key, zmax, rtol, n, error):
+        """Attach to a segment published by another process"""
+        self = cls.__new__(cls)
+        try:
+            # the publisher alone tracks the segment for cleanup
+            segment = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching always tracks the segment,
+            # which is harmless in multiprocessing workers sharing the
+            # publisher's resource tracker
+            segment = shared_memory.SharedMemory(name=name)
+        self._setup(segment, key, zmax, rtol, n, error, owner=False)
+        return self
+
+    def _setup(self, segment, key, zmax, rtol, n, error, owner):
+        self.name = segment.name
+        self.key = key
+        self.zmax = zmax
+        self.rtol = rtol
+        self.n = n
+        self.error = error
+        self.owner = owner
+        self._segment = segment
+        self._grid = np.ndarray((2, n + 1), dtype=float, buffer=segment.buf)
+        self._finalizer = weakref.finalize(self, _release, segment, owner)
+
+    def __reduce__(self):
+        return (SharedTable.attach, (self.name, self.key, self.zmax,
+                                     self.rtol, self.n, self.error))
+
+    def table(self, func):
+        """DistanceTable reading the shared grid without copying it
+
+        Parameters
+        ----------
+        func : callable
+            integrand, used for redshifts outside the table
+        """
+        y, dy = self._grid
+        if self.owner:
+            # nothing else may modify the published grid
+            y, dy = y.view(), dy.view()
+            y.flags.writeable = dy.flags.writeable = False
+        table = DistanceTable.from_grid(func, self.zmax, self.rtol, y, dy,
+                                        self.error, copy=False)
+        # keep the segment mapped for as long as the table is in use
+        table._shared = self
+        return table
+
+    def close(self):
+        """Unmap the segment, and unlink it if this process published it"""
+        self._grid = None
+        self._finalizer()
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
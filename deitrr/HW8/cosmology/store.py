@@ -0,0 +1,166 @@
+"""Persistent on-disk store of distance tables
+
+DistanceTable grids are saved under the user cache directory so that new
+processes load them instead of integrating again.  Each table is a
+memory-mapped ``.npy`` file holding the tabulated values and derivatives,
+next to a ``.json`` file recording the parameters it was built for, the
+achieved error and the format VERSION.  The file name is a hash of the
+parameters; a table is only used if its JSON record matches both the
+parameters and VERSION, so stale or colliding files are rebuilt.  The
+least recently used tables are deleted once the store exceeds maxbytes.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# bump when the layout or meaning of the stored tables changes
+VERSION = 1
+
+
+class TableStore(object):
+    """Directory of saved DistanceTable grids with LRU size eviction
+
+    Parameters
+    ----------
+    directory : string, optional
+        where tables are kept. Default is the 'tables' subdirectory of
+        the package cache directory (COSMOLOGY_CACHE_DIR, or
+        ~/.cache/cosmology)
+    maxbytes : int, optional
+        disk budget of the store. Default = 256 MB.  Set to 0 to disable
+        the store.
+
+    Attributes
+    ----------
+    hits, misses : int
+        number of tables loaded and not found
+    """
+    def __init__(self, directory=None, maxbytes=256 * 2 ** 20):
+        self._directory = directory
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        # resolved on use, so COSMOLOGY_CACHE_DIR may be set after import
+        if self._directory is None:
+            from .lowlevel import cache_dir
+            return os.path.join(cache_dir(), 'tables')
+        return self._directory
+
+    def _path(self, params):
+        name = hashlib.sha1(repr(params).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, 'table-' + name)
+
+    def load(self, params):
+        """Saved (y, dy, error) for params, or None if there is none
+
+        y and dy are read-only memory maps of the stored arrays.
+        """
+        if self.maxbytes <= 0:
+            return None
+        path = self._path(params)
+        try:
+            with open(path + '.json') as f:
+                record = json.load(f)
+            if record['version'] != VERSION or \
+                    record['params'] != repr(params):
+                raise ValueError("stale table")
+            grid = np.load(path + '.npy', mmap_mode='r')
+            if grid.shape != (2, record['n'] + 1):
+                raise ValueError("truncated table")
+            # mark as recently used for eviction
+            os.utime(path + '.json', None)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.asarray(grid[0]), np.asarray(grid[1]), record['error']
+
+    def save(self, params, y, dy, error):
+        """Save the grid of a table built for params"""
+        if self.maxbytes <= 0:
+            return
+        path = self._path(params)
+        record = dict(version=VERSION, params=repr(params), n=len(y) - 1,
+                      error=float(error))
+        with self._lock:
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory)
+                # write to temporary names and rename, data before record,
+                # so that readers never see a partially written table
+                self._write(path + '.npy',
+                            lambda f: np.save(f, np.array([y, dy])))
+                self._write(path + '.json',
+                            lambda f: f.write(json.dumps(record).encode()))
+                self._evict()
+            except OSError:
+                # an unwritable cache only costs the next process time
+                pass
+
+    def _write(self, path, write):
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _entries(self):
+        """(last use, bytes, path) of every stored table"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('table-') and name.endswith('.json'):
+                path = os.path.join(self.directory, name[:-5])
+                try:
+                    nbytes = (os.path.getsize(path + '.json')
+                              + os.path.getsize(path + '.npy'))
+                    entries.append((os.path.getmtime(path + '.json'),
+                                    nbytes, path))
+                except OSError:
+                    pass
+        return sorted(entries)
+
+    @property
+    def nbytes(self):
+        """Disk space used by the stored tables"""
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(nbytes for used, nbytes, path in self._entries())
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(nbytes for used, nbytes, path in entries)
+        for used, nbytes, path in entries:
+            if total <= self.maxbytes:
+                break
+            self._remove(path)
+            total -= nbytes
+
+    @staticmethod
+    def _remove(path):
+        # the record goes first, so the table is never seen half deleted
+        for suffix in ('.json', '.npy'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete every stored table"""
+        if os.path.isdir(self.directory):
+            for used, nbytes, path in self._entries():
+                self._remove(path)
+
+
+# the store used by Cosmology
+table_store = TableStore()
@@ -0,0 +1,607 @@
+"""Tests of the Cosmology backends, helpers and tools
+
+Kept apart from test_cosmology.py, whose nose-style yield tests pytest
+cannot collect.
+"""
+import numpy as np
+from numpy.testing import assert_allclose
+
+from .. import Cosmology
+from .test_cosmology import DC_RESULTS, DA_RESULTS, DL_RESULTS, \
+    MU_RESULTS, assert_equal_to_2_decimals
+
+# COSMOLOGY_CACHE_DIR of the user, restored after the tests
+_environ = {}
+
+
+def setup_module():
+    """Keep the tables the tests build out of the user's cache"""
+    import os
+    import tempfile
+    from ..cache import integral_cache
+    _environ['COSMOLOGY_CACHE_DIR'] = os.environ.get('COSMOLOGY_CACHE_DIR')
+    os.environ['COSMOLOGY_CACHE_DIR'] = tempfile.mkdtemp()
+    # nothing loaded from the user's store may be reused
+    integral_cache.clear()
+
+
+def teardown_module():
+    import os
+    import shutil
+    from ..cache import integral_cache
+    shutil.rmtree(os.environ['COSMOLOGY_CACHE_DIR'])
+    environ = _environ.pop('COSMOLOGY_CACHE_DIR')
+    if environ is None:
+        del os.environ['COSMOLOGY_CACHE_DIR']
+    else:
+        os.environ['COSMOLOGY_CACHE_DIR'] = environ
+    integral_cache.clear()
+
+
+def test_array_input():
+    """Test that array input matches the scalar results and shape"""
+    cosmo = Cosmology(OmegaM=0.3, h=0.7)
+    z = np.array([[0.1, 0.5, 1.0], [1.0, 0.5, 0.1]])
+    for method in (cosmo.DC, cosmo.DM, cosmo.DA, cosmo.DL, cosmo.mu):
+        result = method(z)
+        assert result.shape == z.shape
+        assert_allclose(result, [[method(zi) for zi in row] for row in z],
+                        rtol=1e-10)
+        # scalar input gives a plain float
+        assert type(method(1.0)) is float
+
+
+def test_table_backend():
+    """Test the interpolation table against direct integration"""
+    for (OmegaM, h, z, MU) in MU_RESULTS:
+        cosmo = Cosmology(OmegaM=OmegaM, h=h, backend='table', rtol=1e-10)
+        assert_allclose(cosmo.mu(z), MU, rtol=1e-10)
+        assert cosmo.table.error < 1e-10
+    # outside the table range falls back to integration
+    cosmo = Cosmology(backend='table', zmax=2.0)
+    assert_allclose(cosmo.DC([3.0, 1.0]), Cosmology().DC([3.0, 1.0]))
+
+
+def test_analytic_backend():
+    """Test the closed-form flat backend against quad"""
+    for (OmegaM, h, z, DC) in DC_RESULTS:
+        cosmo = Cosmology(OmegaM=OmegaM, h=h, backend='analytic')
+        assert_equal_to_2_decimals(DC, cosmo.DC(z))
+    for OmegaM in (0.3, 1.0, 1.5):
+        quad = Cosmology(OmegaM=OmegaM)
+        cosmo = Cosmology(OmegaM=OmegaM, backend='analytic')
+        for z in (1e-4, 0.5, 3.0, 1100.):
+            assert_allclose(cosmo.DC(z), quad.DC(z), rtol=1e-10)
+
+
+def test_z_at():
+    """Test inversion of the distance measures"""
+    cosmo = Cosmology(OmegaM=0.3, h=0.7)
+    z = np.array([0.0, 0.01, 0.1, 0.5, 1.0, 1.5])
+    for quantity in ('DC', 'DM', 'DA', 'DL', 'mu'):
+        values = getattr(cosmo, quantity)(z[1:])
+        assert_allclose(cosmo.z_at(quantity, values), z[1:], atol=1e-10)
+    assert_allclose(cosmo.z_at('DC', 0.0), 0.0, atol=1e-10)
+    # DC is bounded, so large values have no solution
+    assert np.isnan(cosmo.z_at('DC', 1e6))
+
+    # in a closed model DM, DL and mu turn over too
+    closed = Cosmology(OmegaM=0.3, OmegaK=-0.5)
+    for quantity in ('DM', 'DL', 'mu'):
+        values = getattr(closed, quantity)(z[1:])
+        assert_allclose(closed.z_at(quantity, values), z[1:], atol=1e-10)
+    # beyond the turnover the root below it is returned
+    values = closed.DM(np.array([5.0, 50.0, 500.0]))
+    z = closed.z_at('DM', values)
+    assert np.all(z < 5.0)
+    assert_allclose(closed.DM(z), values, rtol=1e-10)
+
+
+def test_distance_grid():
+    """Test the (OmegaM, h, z) grid against individual instances"""
+    from .. import distance_grid
+    for quantity, results in (('DC', DC_RESULTS), ('DA', DA_RESULTS),
+                              ('DL', DL_RESULTS), ('mu', MU_RESULTS)):
+        OmegaM = sorted(set(row[0] for row in results))
+        h = sorted(set(row[1] for row in results))
+        z = sorted(set(row[2] for row in results))
+        grid = distance_grid(quantity, OmegaM, h, z)
+        assert grid.shape == (len(OmegaM), len(h), len(z))
+        for (Om, hi, zi, value) in results:
+            result = grid[OmegaM.index(Om), h.index(hi), z.index(zi)]
+            assert_equal_to_2_decimals(value, result)
+
+
+def test_integral_cache():
+    """Test the shared LRU cache of integrals"""
+    from ..cache import IntegralCache, integral_cache
+    integral_cache.clear()
+    Cosmology(OmegaM=0.3, h=0.6).DC(1.0)
+    assert_equal_to_2_decimals(Cosmology(OmegaM=0.3, h=0.7).DC(1.0), 3303.83)
+    assert integral_cache.hits == 1 and integral_cache.misses == 1
+
+    cache = IntegralCache(maxbytes=100)
+    for i in range(5):
+        cache.put(('a', i), float(i), nbytes=30)
+    assert len(cache) == 3 and cache.nbytes == 90
+    assert cache.get(('a', 0)) is None
+    assert cache.get(('a', 4)) == 4.0
+    # arrays over the budget are neither copied nor stored
+    cache.put(('b',), np.zeros(100))
+    assert len(cache) == 3 and cache.get(('b',)) is None
+
+    # a disabled cache, or one too small for the array, is not consulted
+    maxbytes = integral_cache.maxbytes
+    try:
+        for limit in (0, 32):
+            integral_cache.maxbytes = limit
+            integral_cache.clear()
+            Cosmology().DC(np.linspace(0, 1, 5))
+            assert integral_cache.misses == 0 and len(integral_cache) == 0
+    finally:
+        integral_cache.maxbytes = maxbytes
+
+
+def test_distances():
+    """Test that distances() agrees with the individual methods"""
+    for (OmegaM, h, z, MU) in MU_RESULTS:
+        cosmo = Cosmology(OmegaM=OmegaM, h=h)
+        d = cosmo.distances([z, 2 * z])
+        assert sorted(d) == ['DA', 'DC', 'DL', 'DM', 'mu']
+        for name in d:
+            assert_allclose(d[name], getattr(cosmo, name)([z, 2 * z]))
+        assert_allclose(cosmo.distances(z, which=['mu'])['mu'], MU)
+        # a single name, and plain floats for a scalar redshift
+        assert list(cosmo.distances(z, which='mu')) == ['mu']
+        for name, value in cosmo.distances(z).items():
+            assert type(value) is float
+            assert value == getattr(cosmo, name)(z)
+
+
+def test_quad_integrand():
+    """Test the compiled and fallback quad integrands against _Einv"""
+    from scipy import LowLevelCallable, integrate
+    from .. import build_library, lowlevel
+    cosmo = Cosmology(OmegaM=0.3, h=0.7)
+    # nothing is compiled unless asked for
+    func = lowlevel.quad_integrand(cosmo.OmegaM, cosmo.OmegaK, cosmo.OmegaL)
+    assert not isinstance(func, LowLevelCallable)
+    funcs = [func]
+    # values not in the integral cache, so that they are integrated
+    cosmo.DC(0.123)
+    later = Cosmology(OmegaM=0.3, h=0.7)
+    # built in the temporary cache directory (see setup_module)
+    try:
+        if build_library() is not None:
+            funcs.append(lowlevel.quad_integrand(
+                cosmo.OmegaM, cosmo.OmegaK, cosmo.OmegaL))
+            assert isinstance(funcs[-1], LowLevelCallable)
+            # the integrand is chosen at the first scalar integral
+            later.DC(0.456)
+            assert isinstance(later._quad_integrand, LowLevelCallable)
+            assert callable(cosmo._quad_integrand)
+            assert not isinstance(cosmo._quad_integrand, LowLevelCallable)
+    finally:
+        lowlevel._library = None
+    for func in funcs:
+        for z in (0.1, 1.0, 1100.):
+            assert_allclose(integrate.quad(func, 0, z)[0],
+                            integrate.quad(cosmo._Einv, 0, z)[0],
+                            rtol=1e-12)
+
+
+def test_gauss_backend():
+    """Test batched Gauss-Legendre integration against quad"""
+    from ..quadrature import gauss_legendre_integral
+    for (OmegaM, h, z, MU) in MU_RESULTS:
+        cosmo = Cosmology(OmegaM=OmegaM, h=h, backend='gauss', rtol=1e-12)
+        assert_allclose(cosmo.mu(z), MU, rtol=1e-10)
+    cosmo = Cosmology()
+    z = np.random.RandomState(0).uniform(0, 1100, 100)
+    for rtol in (1e-4, 1e-10):
+        y, err = gauss_legendre_integral(cosmo._Einv, z, rtol)
+        assert err <= rtol
+        assert_allclose(y, [cosmo._integral(zi) for zi in z], rtol=2 * rtol)
+
+
+def test_ode_backend():
+    """Test the dense-output ODE backend against direct integration"""
+    for (OmegaM, h, z, MU) in MU_RESULTS:
+        cosmo = Cosmology(OmegaM=OmegaM, h=h, backend='ode', rtol=1e-10)
+        assert_allclose(cosmo.mu(z), MU, rtol=1e-10)
+    # negative redshifts give the signed integral, as with quad
+    z = np.array([0.1, 1.0, 5.0, 50.0, -0.5, 0.0])
+    quad, ode = Cosmology(), Cosmology(backend='ode', zmax=2.0)
+    for name in ('DC', 'tL', 'VC'):
+        assert_allclose(getattr(ode, name)(z), getattr(quad, name)(z),
+                        rtol=1e-7)
+        assert getattr(ode, name)([]).shape == (0,)
+
+
+def test_map():
+    """Test process-pool evaluation against the serial result"""
+    import pickle
+    cosmo = Cosmology(OmegaM=0.4, h=0.6, backend='table')
+    z = np.random.RandomState(0).uniform(0, 3, (50, 20))
+    assert_allclose(cosmo.map('DL', z, n_jobs=2, chunksize=100), cosmo.DL(z))
+    assert len(pickle.dumps(cosmo)) < 200
+
+
+def test_annotate():
+    """Test chunked catalog annotation between file formats"""
+    import os
+    import shutil
+    import tempfile
+    from .. import annotate
+    cosmo = Cosmology(OmegaM=0.3, h=0.7)
+    z = np.random.RandomState(0).uniform(0, 3, 1001)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        infile = os.path.join(tmpdir, 'z.npy')
+        np.save(infile, z)
+        stats = annotate(infile, os.path.join(tmpdir, 'out.csv'), cosmo,
+                         columns=['DA', 'mu'], chunksize=100)
+        assert stats['rows'] == len(z)
+        stats = annotate(os.path.join(tmpdir, 'out.csv'),
+                         os.path.join(tmpdir, 'out.npy'), cosmo,
+                         columns=['mu'], zcol='z', chunksize=100)
+        result = np.load(os.path.join(tmpdir, 'out.npy'))
+        assert result.shape == (len(z), 2)
+        assert_allclose(result[:, 1], cosmo.mu(z), rtol=1e-8)
+
+        # a pipe, like stdin, can only be read once
+        read, write = os.pipe()
+        os.write(write, b'0.1\n0.5\n1.0\n')
+        os.close(write)
+        with os.fdopen(read) as f:
+            stats = annotate(f, os.path.join(tmpdir, 'pipe.npy'), cosmo,
+                             columns=['mu'], chunksize=2)
+        assert stats['rows'] == 3
+        assert_allclose(np.load(os.path.join(tmpdir, 'pipe.npy')),
+                        [[zi, cosmo.mu(zi)] for zi in (0.1, 0.5, 1.0)],
+                        rtol=1e-8)
+
+        # the redshift column named in a header need not be the first
+        infile = os.path.join(tmpdir, 'named.csv')
+        with open(infile, 'w') as f:
+            f.write('id,z\na,0.5\nb,1.0\n')
+        annotate(infile, os.path.join(tmpdir, 'named.npy'), cosmo,
+                 columns=['mu'], zcol='z')
+        assert_allclose(np.load(os.path.join(tmpdir, 'named.npy')),
+                        [[zi, cosmo.mu(zi)] for zi in (0.5, 1.0)],
+                        rtol=1e-8)
+        assert sorted(os.listdir(tmpdir)) == [
+            'named.csv', 'named.npy', 'out.csv', 'out.npy', 'pipe.npy',
+            'z.npy']
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_command_line():
+    """Test the python -m cosmology entry point"""
+    import os
+    import shutil
+    import tempfile
+    from ..__main__ import main
+    tmpdir = tempfile.mkdtemp()
+    try:
+        infile = os.path.join(tmpdir, 'z.txt')
+        outfile = os.path.join(tmpdir, 'out.npy')
+        np.savetxt(infile, [0.1, 0.5, 1.0])
+        main(['--OmegaM', '0.3', '--h', '0.7', '-q', 'mu', '-i', infile,
+              '-o', outfile, '--quiet'])
+        result = np.load(outfile)
+        assert_allclose(result[:, 1], [row[3] for row in MU_RESULTS[9:12]],
+                        rtol=1e-8)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_instrument():
+    """Test the opt-in call and integration counters"""
+    import threading
+    import warnings
+    from ..cache import integral_cache
+    integral_cache.clear()
+    plain = Cosmology(OmegaM=0.25, h=0.7)
+    with plain.instrument() as cosmo:
+        assert cosmo == plain and type(plain) is Cosmology
+        cosmo.mu(1.0)
+        cosmo.DA(np.linspace(0, 1, 10))
+        plain.mu(2.0)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            cosmo._quad(lambda x: np.sin(1 / x), 0, 1)
+    d = cosmo.stats.as_dict()
+    assert d['calls']['mu'] == 1 and d['calls']['DC'] == 2
+    assert d['quad_calls'] == 2 and d['quad_subintervals'] > 1
+    assert d['einv_calls'] == 1 and d['einv_points'] > 10
+    assert d['integration_warnings'] == 1 and len(caught) == 1
+
+    # concurrent instrumentation of a shared instance, from two threads
+    # that also use it uninstrumented, records only each block's calls
+    barrier = threading.Barrier(2)
+    counts = []
+
+    def work(n):
+        with plain.instrument() as cosmo:
+            barrier.wait()
+            for i in range(n):
+                cosmo.DC(0.1 * i)
+                plain.DC(0.1 * i)
+            barrier.wait()
+        counts.append((n, cosmo.stats.calls['DC']))
+    threads = [threading.Thread(target=work, args=(n,)) for n in (5, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(counts) == [(5, 5), (7, 7)]
+    assert type(plain) is Cosmology
+
+    # tables and ODE solutions built while instrumenting stay private
+    for backend in ('table', 'ode'):
+        plain = Cosmology(OmegaM=0.35, h=0.7, backend=backend)
+        with plain.instrument() as cosmo:
+            cosmo.DC(1.0)
+            assert cosmo.stats.einv_calls > 0
+        fresh = Cosmology(OmegaM=0.35, h=0.7, backend=backend)
+        helper = fresh.table.func if backend == 'table' else fresh.ode.Einv
+        assert type(helper.__self__) is Cosmology
+
+
+def test_accuracy():
+    """The accuracy tiers meet their tolerance and estimate their error"""
+    from numpy.testing import assert_, assert_raises
+    z = np.linspace(0.01, 3, 50)
+    precise = Cosmology(OmegaM=0.3, h=0.7, accuracy='precise')
+    exact = precise.DC(z)
+    for accuracy, rtol in (('fast', 1e-4), ('default', 1e-8)):
+        cosmo = Cosmology(OmegaM=0.3, h=0.7, accuracy=accuracy)
+        assert cosmo.rtol == rtol
+        assert_(np.all(abs(cosmo.DC(z) - exact) <= rtol * exact))
+        assert_(np.all(cosmo.error(z) <= rtol))
+        assert_(cosmo.error(1.0) <= rtol)
+    assert Cosmology(accuracy='fast').backend == 'table'
+    assert Cosmology(rtol=1e-10).backend == 'quad'
+    assert Cosmology(backend='gauss', accuracy='fast').rtol == 1e-4
+    assert_raises(ValueError, Cosmology, accuracy='sloppy')
+    for rtol in (1e-15, 0.0, -1e-8, float('nan')):
+        assert_raises(ValueError, Cosmology, rtol=rtol)
+    assert_allclose(Cosmology(rtol=1.2e-14).DC(1.0), precise.DC(1.0),
+                    rtol=1e-12)
+
+    # the estimate made while integrating is kept, not recomputed
+    for backend in ('quad', 'gauss'):
+        with Cosmology(backend=backend, rtol=1e-9).instrument() as cosmo:
+            cosmo.DL(z)
+            cosmo.DL(2.5)
+            einv_points = cosmo.stats.einv_points
+            err = cosmo.error(z)
+            assert err.shape == z.shape and np.all(err <= 1e-9)
+            assert_(cosmo.error(2.5) <= 1e-9)
+            if backend == 'gauss':
+                assert cosmo.stats.einv_points == einv_points
+            else:
+                # one quad integral checks the cumulative rule
+                assert cosmo.stats.quad_calls == 2
+
+
+def test_immutable():
+    """Test that instances are frozen, hashable by value and picklable"""
+    import pickle
+    from numpy.testing import assert_raises
+    cosmo = Cosmology(OmegaM=0.25, h=0.7)
+    assert_raises(AttributeError, setattr, cosmo, 'OmegaM', 0.3)
+    assert_raises(AttributeError, delattr, cosmo, 'h')
+    assert_raises(AttributeError, setattr, cosmo, 'Omega_m', 0.3)
+    for name in ('_key', '_hash', '__class__'):
+        assert_raises(AttributeError, setattr, cosmo, name, None)
+    assert not hasattr(cosmo, '__dict__')
+    assert cosmo == Cosmology(OmegaM=0.25, h=0.7)
+    assert cosmo != Cosmology(OmegaM=0.25, h=0.7, accuracy='precise')
+    assert len(set([cosmo, Cosmology(OmegaM=0.25, h=0.7)])) == 1
+    clone = pickle.loads(pickle.dumps(cosmo))
+    assert clone == cosmo and hash(clone) == hash(cosmo)
+    with cosmo.instrument() as instrumented:
+        assert instrumented == clone and hash(instrumented) == hash(clone)
+        assert_raises(AttributeError, setattr, instrumented, 'h', 0.5)
+    assert type(cosmo) is Cosmology
+
+
+def test_curvature():
+    """Test open and closed models and continuity across flatness"""
+    from numpy.testing import assert_raises
+    from ..curvature import comoving_volume, sinn
+    z = np.array([0.1, 0.5, 1.0, 3.0])
+    for OmegaK in (-0.3, 0.3):
+        cosmo = Cosmology(OmegaM=0.3, h=0.7, OmegaK=OmegaK)
+        assert_allclose(cosmo.OmegaL, 1 - 0.3 - OmegaK)
+        x = cosmo.DC(z) / cosmo.DH
+        s = np.sqrt(abs(OmegaK))
+        expected = np.sinh(s * x) if OmegaK > 0 else np.sin(s * x)
+        assert_allclose(cosmo.DM(z), cosmo.DH * expected / s, rtol=1e-12)
+        ode = Cosmology(OmegaM=0.3, h=0.7, OmegaK=OmegaK, backend='ode')
+        assert_allclose(ode.VC(z), cosmo.VC(z), rtol=1e-6)
+    assert Cosmology(OmegaM=0.3, OmegaL=0.7).OmegaK == 0.0
+    assert_raises(ValueError, Cosmology, OmegaM=0.3, OmegaL=0.5, OmegaK=0.5)
+
+    # smooth through OmegaK = 0, for arrays of curvatures at once
+    OmegaK = np.array([[-1e-3], [-1e-9], [0.0], [1e-9], [1e-3]])
+    x = np.linspace(0, 1.5, 7)
+    assert_allclose(sinn(x, OmegaK), np.tile(x, (5, 1)), rtol=1e-3)
+    assert_allclose(sinn(x, OmegaK)[2], x, rtol=0)
+    assert_allclose(comoving_volume(x, OmegaK),
+                    np.tile(4 * np.pi / 3 * x ** 3, (5, 1)), rtol=2e-3)
+    assert_allclose(comoving_volume(x, OmegaK)[[1, 3]],
+                    np.tile(4 * np.pi / 3 * x ** 3, (2, 1)), rtol=1e-8)
+
+
+def test_server():
+    """Test that concurrent server requests are batched and answered"""
+    import asyncio
+    import json
+    from ..server import DistanceServer
+    cosmo = Cosmology(OmegaM=0.3, h=0.7, backend='table')
+    server = DistanceServer(cosmo, max_delay=0.01)
+    requests = [dict(z=[0.1 * i, 1.0], q='DL') for i in range(10)]
+    requests.append(dict(z=0.5, q=['DA', 'mu']))
+
+    async def query(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(json.dumps(request).encode() + b'\n')
+        response = json.loads(await reader.readline())
+        writer.close()
+        return response
+
+    async def run():
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await asyncio.gather(*[query(port, r) for r in requests])
+
+    responses = asyncio.run(run())
+    for request, response in zip(requests[:-1], responses):
+        assert_allclose(response['DL'], cosmo.DL(request['z']))
+    assert_allclose(responses[-1]['mu'], cosmo.mu(0.5))
+    assert server.requests == 11 and server.batches < 11
+
+
+def test_table_store():
+    """Test saving, reloading and evicting tables on disk"""
+    import os
+    from ..cache import integral_cache
+    from ..lowlevel import cache_dir
+    from ..store import TableStore, table_store
+    integral_cache.clear()
+    table_store.clear()
+    built = Cosmology(OmegaM=0.3, h=0.7, backend='table', rtol=1e-10)
+    z = np.linspace(0, 3, 7)
+    expected = built.DC(z)
+    assert table_store.nbytes > 0
+    integral_cache.clear()
+    hits = table_store.hits
+    loaded = Cosmology(OmegaM=0.3, h=0.7, backend='table', rtol=1e-10)
+    assert_allclose(loaded.DC(z), expected, rtol=0)
+    assert table_store.hits == hits + 1
+    assert loaded.table.error == built.table.error
+    integral_cache.clear()
+
+    store = TableStore(os.path.join(cache_dir(), 'small'), maxbytes=10 ** 4)
+    y = np.linspace(0, 1, 201)
+    store.save(('a',), y, y, 1e-9)
+    assert_allclose(store.load(('a',))[0], y)
+    assert store.load(('b',)) is None
+    store.save(('b',), y, y, 1e-9)
+    store.save(('c',), y, y, 1e-9)
+    assert store.nbytes <= 10 ** 4
+    assert store.load(('a',)) is None and store.load(('c',)) is not None
+
+
+def test_shared_table():
+    """Test publishing a table in shared memory and attaching to it"""
+    import pickle
+    from multiprocessing import shared_memory
+    from numpy.testing import assert_raises
+    from ..cache import integral_cache
+    cosmo = Cosmology(OmegaM=0.3, h=0.7, backend='table')
+    z = np.linspace(0, 3, 7)
+    with cosmo.share_table() as shared:
+        integral_cache.clear()
+        other = Cosmology(OmegaM=0.3, h=0.7, backend='table')
+        other.attach_table(pickle.loads(pickle.dumps(shared)))
+        assert other.table.y.base is not None
+        assert_allclose(other.DL(z), cosmo.DL(z), rtol=0)
+        assert_allclose(other.DL(1.0), cosmo.DL(1.0), rtol=0)
+        assert_raises(ValueError, Cosmology(OmegaM=0.4).attach_table,
+                      shared)
+    assert shared.closed
+    assert_raises(FileNotFoundError, shared_memory.SharedMemory,
+                  shared.name)
+    integral_cache.clear()
+
+
+def test_lazy_import():
+    """Test that importing the package defers NumPy and SciPy"""
+    import os
+    import subprocess
+    import sys
+    from numpy.testing import assert_raises
+    import cosmology
+    code = ("import sys, cosmology; "
+            "print(sorted(m for m in ('numpy', 'scipy', 'multiprocessing') "
+            "if m in sys.modules)); "
+            "cosmology.Cosmology(backend='table').DL(1.0); "
+            "print('scipy' in sys.modules)")
+    here = os.path.dirname(os.path.dirname(os.path.abspath(
+        cosmology.__file__)))
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=here, universal_newlines=True)
+    assert output.split('\n')[:2] == ['[]', 'False']
+    assert cosmology.Cosmology is Cosmology
+    assert 'table_store' in dir(cosmology)
+    assert_raises(AttributeError, getattr, cosmology, 'not_a_name')
+
+
+def test_DA12():
+    """Test the angular diameter distance between pairs of redshifts"""
+    zl = np.array([0.1, 0.3, 0.5, 0.3])
+    zs = np.array([[1.0], [2.0]])
+    for OmegaK in (0.0, 0.1, -0.1):
+        for backend in ('quad', 'table'):
+            cosmo = Cosmology(OmegaK=OmegaK, backend=backend)
+            DA12 = cosmo.DA12(zl, zs)
+            assert DA12.shape == (2, 4)
+            # Hogg eqn 19
+            DM1, DM2, DH = cosmo.DM(zl), cosmo.DM(zs), cosmo.DH
+            expected = (DM2 * np.sqrt(1 + OmegaK * DM1 ** 2 / DH ** 2)
+                        - DM1 * np.sqrt(1 + OmegaK * DM2 ** 2 / DH ** 2)) \
+                / (1 + zs)
+            assert_allclose(DA12, expected, rtol=1e-12)
+            assert_allclose(cosmo.DA12(0.5, 1.0), DA12[0, 2], rtol=1e-12)
+            assert_allclose(cosmo.DA12(0, zs), cosmo.DA(zs), rtol=1e-12)
+    assert Cosmology().DA12(1.0, 1.0) == 0
+    assert type(Cosmology(OmegaK=0.1).DA12(0.5, 1.0)) is float
+
+
+def test_sigma_crit():
+    """Test the lensing critical surface density for arrays and pairs"""
+    import tracemalloc
+    from ..cosmology import SIGMA_CRIT_SCALE
+    zl = np.array([0.2, 0.5, 0.7])
+    zs = np.array([0.3, 1.0, 2.0, 0.1, 0.6])
+    for OmegaK in (0.0, 0.1, -0.1):
+        cosmo = Cosmology(OmegaK=OmegaK, backend='table')
+        expected = SIGMA_CRIT_SCALE * cosmo.DA(zs) \
+            / (cosmo.DA(zl)[:, None] * cosmo.DA12(zl[:, None], zs))
+        expected[zs <= zl[:, None]] = np.inf
+        assert_allclose(cosmo.sigma_crit(zl[:, None], zs), expected,
+                        rtol=1e-12)
+        assert_allclose(cosmo.sigma_crit(0.5, 1.0), expected[1, 1],
+                        rtol=1e-12)
+        # the same pairs as a CSR neighbor list, in small chunks
+        indptr = [0, 3, 3, 5]
+        indices = [0, 2, 4, 1, 3]
+        rows = [0, 0, 0, 2, 2]
+        for chunksize in (2, 2 ** 20):
+            out = np.zeros(5)
+            y = cosmo.sigma_crit(zl, zs, indptr, indices,
+                                 chunksize=chunksize, out=out)
+            assert y is out
+            assert_allclose(y, expected[rows, indices], rtol=1e-12)
+
+    # long pair arrays only need memory for a chunk and the unique values
+    rng = np.random.RandomState(0)
+    zl = np.round(rng.uniform(0.1, 0.8, 10 ** 6), 3)
+    zs = np.round(rng.uniform(0.2, 3.0, 10 ** 6), 3)
+    out = np.empty(len(zl))
+    chunksize = 2 ** 14
+    tracemalloc.start()
+    try:
+        cosmo.sigma_crit(zl, zs, chunksize=chunksize, out=out)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 32 * 8 * chunksize
+    assert_allclose(out[:100], cosmo.sigma_crit(zl[:100], zs[:100]),
+                    rtol=1e-12)
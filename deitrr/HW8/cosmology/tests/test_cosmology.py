@@ -144,4 +144,4 @@ def test_mu():
     """Test Distance Modulus"""
     for (OmegaM, h, z, MU) in MU_RESULTS:
         cosmo = Cosmology(OmegaM=OmegaM, h=h)
-        yield assert_equal_to_2_decimals, MU, cosmo.mu(z)
\ No newline at end of file
+        yield assert_equal_to_2_decimals, MU, cosmo.mu(z)